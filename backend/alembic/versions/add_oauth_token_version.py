@@ -0,0 +1,24 @@
+"""Add oauth_tokens.version so every process notices a reconnect
+
+Revision ID: add_oauth_token_version
+Revises: add_user_data_version
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_oauth_token_version'
+down_revision = 'add_user_data_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('oauth_tokens', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('oauth_tokens', 'version')
@@ -0,0 +1,50 @@
+"""Add per-user order counters and backfill them from existing orders
+
+Revision ID: add_order_counters
+Revises: add_orders_keyset_index
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_order_counters'
+down_revision = 'add_orders_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Reuse the enum types created for orders
+    order_source = postgresql.ENUM('ETSY', 'TIKTOK_SHOP', name='ordersource', create_type=False)
+    order_status = postgresql.ENUM('PENDING', 'PROCESSING', 'SHIPPED', 'DELIVERED', 'CANCELLED', name='orderstatus', create_type=False)
+
+    op.create_table('order_counters',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('source', order_source, nullable=False),
+    sa.Column('status', order_status, nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_order_counters_id'), 'order_counters', ['id'], unique=False)
+    op.create_index('ix_order_counters_user_source_status', 'order_counters', ['user_id', 'source', 'status'], unique=True)
+
+    # Orders without a status are counted as pending
+    op.execute("""
+        INSERT INTO order_counters (user_id, source, status, count)
+        SELECT user_id, source, COALESCE(status, 'PENDING'), COUNT(*)
+        FROM orders
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id, source, COALESCE(status, 'PENDING')
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_order_counters_user_source_status', table_name='order_counters')
+    op.drop_index(op.f('ix_order_counters_id'), table_name='order_counters')
+    op.drop_table('order_counters')
@@ -0,0 +1,59 @@
+"""Add per-user monthly order rollups and backfill them from existing orders
+
+Revision ID: add_order_monthly_rollups
+Revises: add_order_search
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_order_monthly_rollups'
+down_revision = 'add_order_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Reuse the enum type created for orders
+    order_source = postgresql.ENUM('ETSY', 'TIKTOK_SHOP', name='ordersource', create_type=False)
+
+    op.create_table('order_monthly_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('source', order_source, nullable=False),
+    sa.Column('currency', sa.String(), nullable=False),
+    sa.Column('order_count', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_order_monthly_rollups_id'), 'order_monthly_rollups', ['id'], unique=False)
+    op.create_index(
+        'ix_order_monthly_rollups_user_month_source_currency',
+        'order_monthly_rollups',
+        ['user_id', 'month', 'source', 'currency'],
+        unique=True
+    )
+
+    if op.get_bind().dialect.name == "postgresql":
+        month = "date_trunc('month', order_date)::date"
+    else:
+        month = "strftime('%Y-%m-01', order_date)"
+    op.execute(f"""
+        INSERT INTO order_monthly_rollups (user_id, month, source, currency, order_count, revenue)
+        SELECT user_id, {month}, source, COALESCE(currency, 'USD'), COUNT(*), COALESCE(SUM(total_amount), 0)
+        FROM orders
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id, {month}, source, COALESCE(currency, 'USD')
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_order_monthly_rollups_user_month_source_currency', table_name='order_monthly_rollups')
+    op.drop_index(op.f('ix_order_monthly_rollups_id'), table_name='order_monthly_rollups')
+    op.drop_table('order_monthly_rollups')
@@ -0,0 +1,82 @@
+"""Add indexed order search text (pg_trgm GIN on PostgreSQL, FTS5 on SQLite)
+
+Revision ID: add_order_search
+Revises: add_order_counters
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+import json
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_order_search'
+down_revision = 'add_order_counters'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def _search_text(customer_name, customer_email, external_id, items):
+    # Mirrors app.models.order.build_search_text at the time of this migration
+    if isinstance(items, str):
+        items = json.loads(items)
+    parts = [customer_name, customer_email, external_id]
+    parts.extend(item.get("title") for item in items or [] if isinstance(item, dict))
+    return " ".join(str(part) for part in parts if part).lower()
+
+
+def upgrade() -> None:
+    op.add_column('orders', sa.Column('search_text', sa.Text(), nullable=True))
+
+    # Backfill in id order, one batch per round trip
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(
+            "SELECT id, customer_name, customer_email, external_id, items FROM orders "
+            "WHERE id > :last_id ORDER BY id LIMIT :batch_size"
+        ), {"last_id": last_id, "batch_size": BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        bind.execute(
+            sa.text("UPDATE orders SET search_text = :search_text WHERE id = :id"),
+            [{"id": row.id, "search_text": _search_text(row.customer_name, row.customer_email, row.external_id, row.items)} for row in rows]
+        )
+        last_id = rows[-1].id
+
+    if bind.dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_orders_search_text_trgm ON orders USING gin (search_text gin_trgm_ops)")
+    elif bind.dialect.name == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE orders_search USING fts5("
+            "search_text, content='orders', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER orders_search_ai AFTER INSERT ON orders BEGIN "
+            "INSERT INTO orders_search(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        op.execute(
+            "CREATE TRIGGER orders_search_ad AFTER DELETE ON orders BEGIN "
+            "INSERT INTO orders_search(orders_search, rowid, search_text) VALUES ('delete', old.id, old.search_text); END"
+        )
+        op.execute(
+            "CREATE TRIGGER orders_search_au AFTER UPDATE OF search_text ON orders BEGIN "
+            "INSERT INTO orders_search(orders_search, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+            "INSERT INTO orders_search(rowid, search_text) VALUES (new.id, new.search_text); END"
+        )
+        op.execute("INSERT INTO orders_search(orders_search) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_orders_search_text_trgm")
+    elif bind.dialect.name == "sqlite":
+        for trigger in ("orders_search_ai", "orders_search_ad", "orders_search_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS orders_search")
+    op.drop_column('orders', 'search_text')
@@ -0,0 +1,48 @@
+"""Add unique (user_id, source, external_id) key to orders and import counters to sync logs
+
+Revision ID: add_order_upsert_key
+Revises: add_name_to_user
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_order_upsert_key'
+down_revision = 'add_name_to_user'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Older imports could store the same receipt twice - keep the newest copy
+    op.execute(
+        "UPDATE sync_logs SET order_id = NULL WHERE order_id IN ("
+        "SELECT id FROM orders WHERE id NOT IN ("
+        "SELECT MAX(id) FROM orders GROUP BY user_id, source, external_id))"
+    )
+    op.execute(
+        "DELETE FROM orders WHERE id NOT IN ("
+        "SELECT MAX(id) FROM orders GROUP BY user_id, source, external_id)"
+    )
+    
+    # Unique index doubles as the ON CONFLICT target for bulk upserts
+    op.create_index(
+        'ix_orders_user_source_external_id',
+        'orders',
+        ['user_id', 'source', 'external_id'],
+        unique=True
+    )
+    
+    op.add_column('sync_logs', sa.Column('records_inserted', sa.Integer(), server_default='0', nullable=True))
+    op.add_column('sync_logs', sa.Column('records_updated', sa.Integer(), server_default='0', nullable=True))
+    op.add_column('sync_logs', sa.Column('records_unchanged', sa.Integer(), server_default='0', nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('sync_logs', 'records_unchanged')
+    op.drop_column('sync_logs', 'records_updated')
+    op.drop_column('sync_logs', 'records_inserted')
+    op.drop_index('ix_orders_user_source_external_id', table_name='orders')
@@ -0,0 +1,29 @@
+"""Add (user_id, order_date DESC, id DESC) index for keyset pagination of orders
+
+Revision ID: add_orders_keyset_index
+Revises: add_sync_jobs
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_orders_keyset_index'
+down_revision = 'add_sync_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_orders_user_order_date_id',
+        'orders',
+        ['user_id', sa.text('order_date DESC'), sa.text('id DESC')],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_orders_user_order_date_id', table_name='orders')
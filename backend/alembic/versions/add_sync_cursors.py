@@ -0,0 +1,38 @@
+"""Add sync cursors for incremental order imports
+
+Revision ID: add_sync_cursors
+Revises: add_order_upsert_key
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_sync_cursors'
+down_revision = 'add_order_upsert_key'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('sync_cursors',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('last_created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_updated_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sync_cursors_id'), 'sync_cursors', ['id'], unique=False)
+    op.create_index('ix_sync_cursors_user_source', 'sync_cursors', ['user_id', 'source'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sync_cursors_user_source', table_name='sync_cursors')
+    op.drop_index(op.f('ix_sync_cursors_id'), table_name='sync_cursors')
+    op.drop_table('sync_cursors')
@@ -0,0 +1,62 @@
+"""Add sync job queue and user_id on sync logs
+
+Revision ID: add_sync_jobs
+Revises: add_sync_cursors
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_sync_jobs'
+down_revision = 'add_sync_cursors'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('sync_logs', sa.Column('user_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_sync_logs_user_id'), 'sync_logs', ['user_id'], unique=False)
+    op.create_foreign_key('fk_sync_logs_user_id', 'sync_logs', 'users', ['user_id'], ['id'])
+    
+    # Reuse the enum types created for sync_logs
+    sync_type = postgresql.ENUM('ORDER_IMPORT', 'ORDER_EXPORT', 'PRODUCT_IMPORT', 'PRODUCT_EXPORT', name='synctype', create_type=False)
+    sync_status = postgresql.ENUM('PENDING', 'IN_PROGRESS', 'SUCCESS', 'FAILED', name='syncstatus', create_type=False)
+    
+    op.create_table('sync_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('sync_log_id', sa.Integer(), nullable=False),
+    sa.Column('sync_type', sync_type, nullable=False),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('status', sync_status, nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('locked_by', sa.String(), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['sync_log_id'], ['sync_logs.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sync_jobs_id'), 'sync_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_sync_jobs_user_id'), 'sync_jobs', ['user_id'], unique=False)
+    op.create_index('ix_sync_jobs_status_run_after', 'sync_jobs', ['status', 'run_after'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sync_jobs_status_run_after', table_name='sync_jobs')
+    op.drop_index(op.f('ix_sync_jobs_user_id'), table_name='sync_jobs')
+    op.drop_index(op.f('ix_sync_jobs_id'), table_name='sync_jobs')
+    op.drop_table('sync_jobs')
+    op.drop_constraint('fk_sync_logs_user_id', 'sync_logs', type_='foreignkey')
+    op.drop_index(op.f('ix_sync_logs_user_id'), table_name='sync_logs')
+    op.drop_column('sync_logs', 'user_id')
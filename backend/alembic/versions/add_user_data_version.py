@@ -0,0 +1,24 @@
+"""Add users.data_version for versioned response caching
+
+Revision ID: add_user_data_version
+Revises: add_order_monthly_rollups
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_user_data_version'
+down_revision = 'add_order_monthly_rollups'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'data_version')
@@ -4,12 +4,15 @@ from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime, timedelta
-from app.core.database import get_db
+from app.core.database import DbSession, get_request_db, run_db
 from app.core.config import settings
+from app.core.http import get_http_client
 from app.core.auth import get_session
-from app.core.user import get_or_create_user
+from app.core.user import get_or_create_user_async
 from app.models.oauth_token import OAuthToken
 from app.models.oauth_state import OAuthState
+from app.models.user import User
+from app.services.integrations.token_cache import oauth_token_cache
 from supertokens_python.recipe.session import SessionContainer
 import httpx
 import secrets
@@ -21,7 +24,7 @@ router = APIRouter()
 
 @router.get("/etsy/authorize")
 async def etsy_authorize(
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Initiate Etsy OAuth flow with PKCE (requires authentication)"""
@@ -41,13 +44,7 @@ async def etsy_authorize(
     ).decode('utf-8').rstrip('=')
     
     # Store state and code_verifier in database for retrieval during callback
-    oauth_state = OAuthState(
-        state=state,
-        code_verifier=code_verifier,
-        source="etsy"
-    )
-    db.add(oauth_state)
-    db.commit()
+    await run_db(db, _store_oauth_state, state, code_verifier)
     
     auth_url = (
         f"https://www.etsy.com/oauth/connect?"
@@ -67,14 +64,55 @@ async def etsy_authorize(
     }
 
 
+def _store_oauth_state(db: Session, state: str, code_verifier: str):
+    db.add(OAuthState(
+        state=state,
+        code_verifier=code_verifier,
+        source="etsy"
+    ))
+    db.commit()
+
+
+def _get_code_verifier(db: Session, state: str) -> Optional[str]:
+    oauth_state = db.query(OAuthState).filter(
+        OAuthState.state == state,
+        OAuthState.source == "etsy"
+    ).first()
+    return oauth_state.code_verifier if oauth_state else None
+
+
+def _save_etsy_token(db: Session, user_id: int, state: str, values: dict):
+    """Store or update the user's Etsy token and clean up the temporary state record"""
+    existing_token = db.query(OAuthToken).filter(
+        OAuthToken.source == "etsy",
+        OAuthToken.user_id == user_id
+    ).first()
+    
+    if existing_token:
+        for key, value in values.items():
+            setattr(existing_token, key, value)
+        # Processes holding the old token in memory see the new version and reload
+        existing_token.version = OAuthToken.version + 1
+    else:
+        db.add(OAuthToken(user_id=user_id, source="etsy", **values))
+    db.commit()
+    
+    db.query(OAuthState).filter(
+        OAuthState.state == state,
+        OAuthState.source == "etsy"
+    ).delete(synchronize_session=False)
+    db.commit()
+
+
 @router.get("/etsy/callback")
 async def etsy_callback(
     code: Optional[str] = Query(None),
     state: Optional[str] = Query(None),
     error: Optional[str] = Query(None),
     error_description: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    session: SessionContainer = Depends(get_session)
+    db: DbSession = Depends(get_request_db),
+    session: SessionContainer = Depends(get_session),
+    http_client: httpx.AsyncClient = Depends(get_http_client)
 ):
     """Handle Etsy OAuth callback with PKCE"""
     if not settings.ETSY_API_KEY or not settings.ETSY_API_SECRET:
@@ -106,12 +144,9 @@ async def etsy_callback(
         )
     
     # Retrieve code_verifier from database using state
-    oauth_state = db.query(OAuthState).filter(
-        OAuthState.state == state,
-        OAuthState.source == "etsy"
-    ).first()
+    code_verifier = await run_db(db, _get_code_verifier, state)
     
-    if not oauth_state:
+    if not code_verifier:
         raise HTTPException(
             status_code=400,
             detail=(
@@ -120,8 +155,6 @@ async def etsy_callback(
             )
         )
     
-    code_verifier = oauth_state.code_verifier
-    
     try:
         # Exchange authorization code for access token with PKCE
         # Etsy requires Basic Auth with keystring (API key) as username and shared secret as password
@@ -135,24 +168,22 @@ async def etsy_callback(
         combined_key_preview = combined_key[:20] + "..." if len(combined_key) > 20 else combined_key
         shop_info = {}
 
-        async with httpx.AsyncClient() as client:
-            # Try format: username = keystring, password = shared_secret (standard OAuth)
-            response = await client.post(
-                token_url,
-                data={
-                    "grant_type": "authorization_code",
-                    "client_id": settings.ETSY_API_KEY,
-                    "code": code,
-                    "redirect_uri": settings.ETSY_REDIRECT_URI,
-                    "code_verifier": code_verifier,  # PKCE requirement
-                },
-                headers={
-                    "Content-Type": "application/x-www-form-urlencoded",
-                },
-                timeout=30.0
-            )
-            response.raise_for_status()
-            token_data = response.json()
+        # Try format: username = keystring, password = shared_secret (standard OAuth)
+        response = await http_client.post(
+            token_url,
+            data={
+                "grant_type": "authorization_code",
+                "client_id": settings.ETSY_API_KEY,
+                "code": code,
+                "redirect_uri": settings.ETSY_REDIRECT_URI,
+                "code_verifier": code_verifier,  # PKCE requirement
+            },
+            headers={
+                "Content-Type": "application/x-www-form-urlencoded",
+            }
+        )
+        response.raise_for_status()
+        token_data = response.json()
         
         # Etsy returns access_token in the response
         access_token = token_data.get("access_token")
@@ -162,7 +193,7 @@ async def etsy_callback(
                 detail=f"Etsy did not return an access token. Response: {token_data}"
             )
 
-        shop_info = await _get_shop_info(token_data.get("access_token"))
+        shop_info = await _get_shop_info(token_data.get("access_token"), http_client)
         if not shop_info:
             raise HTTPException(
                 status_code=500,
@@ -174,41 +205,21 @@ async def etsy_callback(
         expires_at = datetime.utcnow() + timedelta(seconds=expires_in)
         
         # Get or create user in local database
-        user = get_or_create_user(db, session)
+        user = await get_or_create_user_async(db, session)
         
-        # Store or update token in database (user-specific)
-        existing_token = db.query(OAuthToken).filter(
-            OAuthToken.source == "etsy",
-            OAuthToken.user_id == user.id
-        ).first()
-
         print(f"Shop info: {shop_info}")
         
-        if existing_token:
-            existing_token.access_token = access_token
-            existing_token.refresh_token = token_data.get("refresh_token")
-            existing_token.token_type = token_data.get("token_type", "Bearer")
-            existing_token.expires_at = expires_at
-            existing_token.shop_id = shop_info.get("id", "")
-            existing_token.shop_name = shop_info.get("name", "")
-        else:
-            new_token = OAuthToken(
-                user_id=user.id,
-                source="etsy",
-                access_token=access_token,
-                refresh_token=token_data.get("refresh_token"),
-                token_type=token_data.get("token_type", "Bearer"),
-                expires_at=expires_at,
-                shop_id=shop_info.get("id", ""),
-                shop_name=shop_info.get("name", ""),
-            )
-            db.add(new_token)
-        
-        db.commit()
-        
-        # Clean up the temporary state record
-        db.delete(oauth_state)
-        db.commit()
+        # Store or update token in database (user-specific)
+        await run_db(db, _save_etsy_token, user.id, state, {
+            "access_token": access_token,
+            "refresh_token": token_data.get("refresh_token"),
+            "token_type": token_data.get("token_type", "Bearer"),
+            "expires_at": expires_at,
+            "shop_id": shop_info.get("id", ""),
+            "shop_name": shop_info.get("name", ""),
+        })
+        # Drop this process's copy now; other processes notice the version change on next use
+        oauth_token_cache.invalidate(user.id, "etsy")
         
         # Return HTML page that closes the popup and notifies parent
         html_content = f"""
@@ -287,51 +298,46 @@ async def etsy_callback(
         raise HTTPException(status_code=500, detail=f"Error during authentication: {str(e)}")
 
 
-async def _get_shop_info(access_token: str) -> Optional[dict]:
+async def _get_shop_info(access_token: str, http_client: httpx.AsyncClient) -> Optional[dict]:
     """Get shop information using access token"""
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "x-api-key": settings.ETSY_API_KEY or "",
+    }
     try:
-        async with httpx.AsyncClient() as client:
-            # First get the user info to get user_id
-            user_response = await client.get(
-                "https://openapi.etsy.com/v3/application/users/me",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "x-api-key": settings.ETSY_API_KEY or "",
-                },
-                timeout=30.0
-            )
-            user_response.raise_for_status()
-            user_data = user_response.json()
-            user_id = user_data.get("user_id")
-            
-            if not user_id:
-                print("Could not get user_id from Etsy API")
-                return None
-            
-            # Convert user_id to int (Etsy API requires int in URL path)
-            try:
-                user_id_int = int(user_id)
-            except (ValueError, TypeError):
-                print(f"Invalid user_id format: {user_id}")
-                return None
-            print(f"User ID: {user_id_int}")
-            # Get user's shops using the user_id (must be int, not string)
-            shops_response = await client.get(
-                f"https://openapi.etsy.com/v3/application/users/{user_id_int}/shops",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "x-api-key": settings.ETSY_API_KEY or "",
-                },
-                timeout=30.0
-            )
-            print(f"Shops response: {shops_response.status_code}")
-            print(f"Shops response: {shops_response.json()}")
-            shops_response.raise_for_status()
-            shops_data = shops_response.json()
-            return {
-                "id": shops_data.get("shop_id", ""),
-                "name": shops_data.get("shop_name", ""),
-            }
+        # First get the user info to get user_id
+        user_response = await http_client.get(
+            "https://openapi.etsy.com/v3/application/users/me",
+            headers=headers
+        )
+        user_response.raise_for_status()
+        user_data = user_response.json()
+        user_id = user_data.get("user_id")
+        
+        if not user_id:
+            print("Could not get user_id from Etsy API")
+            return None
+        
+        # Convert user_id to int (Etsy API requires int in URL path)
+        try:
+            user_id_int = int(user_id)
+        except (ValueError, TypeError):
+            print(f"Invalid user_id format: {user_id}")
+            return None
+        print(f"User ID: {user_id_int}")
+        # Get user's shops using the user_id (must be int, not string)
+        shops_response = await http_client.get(
+            f"https://openapi.etsy.com/v3/application/users/{user_id_int}/shops",
+            headers=headers
+        )
+        print(f"Shops response: {shops_response.status_code}")
+        print(f"Shops response: {shops_response.json()}")
+        shops_response.raise_for_status()
+        shops_data = shops_response.json()
+        return {
+            "id": shops_data.get("shop_id", ""),
+            "name": shops_data.get("shop_name", ""),
+        }
     except httpx.HTTPStatusError as e:
         print(f"Error getting shop info: {e.response.status_code} - {e.response.text}")
         return None
@@ -342,14 +348,18 @@ async def _get_shop_info(access_token: str) -> Optional[dict]:
 
 @router.get("/etsy/status")
 async def etsy_status(
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Check Etsy authentication status for the authenticated user"""
-    user = get_or_create_user(db, session)
+    user = await get_or_create_user_async(db, session)
+    return await run_db(db, _etsy_status, user.id)
+
+
+def _etsy_status(db: Session, user_id: int) -> dict:
     token = db.query(OAuthToken).filter(
         OAuthToken.source == "etsy",
-        OAuthToken.user_id == user.id
+        OAuthToken.user_id == user_id
     ).first()
     
     if not token:
@@ -371,13 +381,7 @@ async def etsy_status(
     }
 
 
-@router.get("/user/sync")
-async def sync_user(
-    db: Session = Depends(get_db),
-    session: SessionContainer = Depends(get_session)
-):
-    """Sync/create user in local database after SuperTokens authentication"""
-    user = get_or_create_user(db, session)
+def _user_profile(user: User) -> dict:
     return {
         "id": user.id,
         "email": user.email,
@@ -387,6 +391,16 @@ async def sync_user(
     }
 
 
+@router.get("/user/sync")
+async def sync_user(
+    db: DbSession = Depends(get_request_db),
+    session: SessionContainer = Depends(get_session)
+):
+    """Sync/create user in local database after SuperTokens authentication"""
+    user = await get_or_create_user_async(db, session)
+    return _user_profile(user)
+
+
 class UserProfileUpdate(BaseModel):
     name: str  # Required field
 
@@ -394,26 +408,21 @@ class UserProfileUpdate(BaseModel):
 @router.put("/user/profile")
 async def update_user_profile(
     profile_data: UserProfileUpdate,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Update user profile information"""
-    user = get_or_create_user(db, session)
-    
     # Name is required, so validate it's not empty
     if not profile_data.name or not profile_data.name.strip():
         raise HTTPException(status_code=400, detail="Name is required and cannot be empty")
     
-    user.name = profile_data.name.strip()
-    
+    user = await get_or_create_user_async(db, session)
+    return await run_db(db, _update_user_name, user, profile_data.name.strip())
+
+
+def _update_user_name(db: Session, user: User, name: str) -> dict:
+    user.name = name
     db.commit()
     db.refresh(user)
-    
-    return {
-        "id": user.id,
-        "email": user.email,
-        "name": user.name,
-        "supertokens_user_id": user.supertokens_user_id,
-        "created_at": user.created_at.isoformat() if user.created_at else None,
-    }
+    return _user_profile(user)
 
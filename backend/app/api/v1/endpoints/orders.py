@@ -1,39 +1,97 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import func, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query as SAQuery, Session
+from typing import Iterator, List, Literal, Optional, Tuple
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from enum import Enum
+import base64
+import csv
+import io
+import json
+import zlib
+import orjson
+from app.core.config import settings
+from app.core.database import DbSession, SessionLocal, get_db, get_request_db, run_db
 from app.core.auth import get_session
-from app.core.user import get_current_user_id
+from app.core.response_cache import cached_response
+from app.core.serialization import serialize_rows
+from app.core.user import get_current_user_id, get_current_user_id_async
 from app.models.order import Order, OrderSource, OrderStatus
-from app.schemas.order import Order as OrderSchema, OrderCreate, OrderUpdate, OrdersResponse
+from app.models.order_rollup import OrderMonthlyRollup
+from app.schemas.order import (
+    Order as OrderSchema,
+    OrderBulkCreate,
+    OrderBulkResponse,
+    OrderBulkUpdate,
+    OrderCreate,
+    OrderUpdate,
+    OrdersResponse,
+)
+from app.services.order_bulk import bulk_create_orders, bulk_update_orders
+from app.services.order_search import search_orders
+from app.services.order_stats import count_orders, estimate_count, order_snapshot, record_order_changes
 from supertokens_python.recipe.session import SessionContainer
 
 router = APIRouter()
 
+# Columns shown by the orders table, returned for view=summary
+SUMMARY_FIELDS = (
+    "id",
+    "external_id",
+    "source",
+    "status",
+    "customer_name",
+    "total_amount",
+    "currency",
+    "order_date",
+)
 
-@router.get("/", response_model=OrdersResponse)
-def get_orders(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(50, ge=1, le=100),
+
+def _encode_cursor(order: Order) -> str:
+    """Opaque keyset cursor pointing just after the given order"""
+    raw = json.dumps([order.order_date.isoformat(), order.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        order_date, order_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(order_date), int(order_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _selected_fields(view: str, fields: Optional[str]) -> Optional[List[str]]:
+    """Order fields to return for a partial view, or None for full orders"""
+    if fields:
+        requested = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in requested if field not in OrderSchema.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown order fields: {', '.join(unknown)}")
+        # id is always included so rows can be linked to the order detail
+        return ["id"] + [field for field in dict.fromkeys(requested) if field != "id"]
+    if view == "summary":
+        return list(SUMMARY_FIELDS)
+    return None
+
+
+def _filter_orders(
+    query: SAQuery,
+    user_id: int,
     source: Optional[OrderSource] = None,
     status: Optional[OrderStatus] = None,
-    search: Optional[str] = Query(None, description="Search in customer name, email, or external_id"),
-    currency: Optional[str] = Query(None, description="Filter by currency code"),
-    min_amount: Optional[float] = Query(None, ge=0, description="Minimum order amount"),
-    max_amount: Optional[float] = Query(None, ge=0, description="Maximum order amount"),
-    date_from: Optional[str] = Query(None, description="Filter orders from this date (YYYY-MM-DD)"),
-    date_to: Optional[str] = Query(None, description="Filter orders to this date (YYYY-MM-DD)"),
-    db: Session = Depends(get_db),
-    session: SessionContainer = Depends(get_session)
-):
-    """Get all orders for the authenticated user with optional filtering, pagination, and search"""
-    from sqlalchemy import or_, and_
-    from datetime import datetime
-    
-    user_id = get_current_user_id(db, session)
-    
-    query = db.query(Order).filter(Order.user_id == user_id)
-    
+    search: Optional[str] = None,
+    currency: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None
+) -> SAQuery:
+    """Apply the order list filters shared by the list endpoints"""
     if source:
         query = query.filter(Order.source == source)
     if status:
@@ -41,12 +99,7 @@ def get_orders(
     
     # Add search functionality
     if search:
-        search_filter = or_(
-            Order.customer_name.ilike(f"%{search}%"),
-            Order.customer_email.ilike(f"%{search}%"),
-            Order.external_id.ilike(f"%{search}%")
-        )
-        query = query.filter(search_filter)
+        query = search_orders(query.session, query, user_id, search)
     
     # Currency filter
     if currency:
@@ -75,60 +128,165 @@ def get_orders(
         except ValueError:
             pass  # Invalid date format, ignore
     
-    # Get total count before pagination
-    total = query.count()
+    return query
+
+
+@router.get("/", response_model=OrdersResponse)
+async def get_orders(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor (replaces skip)"),
+    source: Optional[OrderSource] = None,
+    status: Optional[OrderStatus] = None,
+    search: Optional[str] = Query(None, description="Search in customer name, email, external_id or item titles"),
+    currency: Optional[str] = Query(None, description="Filter by currency code"),
+    min_amount: Optional[float] = Query(None, ge=0, description="Minimum order amount"),
+    max_amount: Optional[float] = Query(None, ge=0, description="Maximum order amount"),
+    date_from: Optional[str] = Query(None, description="Filter orders from this date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="Filter orders to this date (YYYY-MM-DD)"),
+    count: Literal["exact", "estimate", "none"] = Query(
+        "exact", description="How to compute total when filtering beyond source/status"
+    ),
+    view: Literal["full", "summary"] = Query("full", description="summary returns only the columns the orders table shows"),
+    fields: Optional[str] = Query(None, description="Comma-separated order fields to return (overrides view)"),
+    db: DbSession = Depends(get_request_db),
+    session: SessionContainer = Depends(get_session)
+):
+    """Get all orders for the authenticated user with optional filtering, pagination, and search"""
+    user_id = await get_current_user_id_async(db, session)
+    filters = {
+        "source": source,
+        "status": status,
+        "search": search,
+        "currency": currency,
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "date_from": date_from,
+        "date_to": date_to,
+    }
+    page = await run_db(
+        db, _list_orders, user_id, skip, limit, cursor, filters, count, _selected_fields(view, fields)
+    )
+    
+    # Rows come from our own table, so encode them directly instead of
+    # validating each one through OrdersResponse
+    return ORJSONResponse(page)
+
+
+def _list_orders(
+    db: Session,
+    user_id: int,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+    filters: dict,
+    count: str,
+    selected: Optional[List[str]]
+) -> dict:
+    # Partial views select only their columns, so the JSON columns are never loaded
+    if selected is None:
+        base_query = db.query(Order)
+    else:
+        # order_date is needed for the next cursor even when not returned
+        columns = selected + ["order_date"] if "order_date" not in selected else selected
+        base_query = db.query(*[getattr(Order, column) for column in columns])
+    
+    query = _filter_orders(base_query.filter(Order.user_id == user_id), user_id, **filters)
     
-    # Apply pagination - order by newest first (order_date descending, then id descending as tiebreaker)
-    orders = query.order_by(Order.order_date.desc(), Order.id.desc()).offset(skip).limit(limit).all()
+    # Source/status filters are answered exactly from the per-user counters;
+    # anything else costs a scan, so the caller chooses how to pay for it
+    if not any(value is not None for key, value in filters.items() if key not in ("source", "status")):
+        total = count_orders(db, user_id, source=filters["source"], status=filters["status"])
+    elif count == "estimate":
+        total = estimate_count(db, query)
+    elif count == "exact":
+        total = query.count()
+    else:
+        total = None
+    
+    # Newest first (order_date descending, then id descending as tiebreaker),
+    # served by the (user_id, order_date, id) index
+    query = query.order_by(Order.order_date.desc(), Order.id.desc())
+    if cursor:
+        # Keyset pagination: seek past the last row of the previous page
+        cursor_date, cursor_id = _decode_cursor(cursor)
+        query = query.filter(tuple_(Order.order_date, Order.id) < tuple_(cursor_date, cursor_id))
+        skip = 0
+    else:
+        query = query.offset(skip)
+    orders = query.limit(limit).all()
+    next_cursor = _encode_cursor(orders[-1]) if len(orders) == limit else None
+    
+    if selected is not None:
+        # Rows are plain column tuples; skip OrderSchema validation for partial items
+        items = [{field: getattr(row, field) for field in selected} for row in orders]
+    else:
+        items = serialize_rows(orders, OrderSchema)
     
     return {
-        "items": orders,
+        "items": items,
         "total": total,
         "skip": skip,
-        "limit": limit
+        "limit": limit,
+        "next_cursor": next_cursor,
     }
 
+
 @router.get("/count", response_model=dict)
-def get_orders_count(
-    db: Session = Depends(get_db),
+async def get_orders_count(
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Get the total number of orders for the authenticated user"""
-    user_id = get_current_user_id(db, session)
-    count = db.query(Order).filter(Order.user_id == user_id).count()
-    return { "count": count }
+    user_id = await get_current_user_id_async(db, session)
+    return await run_db(
+        db, cached_response, request, response, user_id, "count",
+        lambda db: { "count": count_orders(db, user_id) }
+    )
 
 
 @router.get("/stats/last-30-days", response_model=dict)
-def get_last_30_days_stats(
-    db: Session = Depends(get_db),
+async def get_last_30_days_stats(
+    request: Request,
+    response: Response,
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Get statistics for the last 30 days"""
-    from datetime import datetime, timedelta, timezone
-    
-    user_id = get_current_user_id(db, session)
-    thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-    
-    # Get orders from last 30 days
-    orders = db.query(Order).filter(
+    user_id = await get_current_user_id_async(db, session)
+    # Window start moves once an hour so the result can be cached in between
+    this_hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    thirty_days_ago = this_hour - timedelta(days=30)
+    return await run_db(
+        db, cached_response, request, response, user_id, ("last-30-days", thirty_days_ago),
+        lambda db: _last_30_days_stats(db, user_id, thirty_days_ago)
+    )
+
+
+def _last_30_days_stats(db: Session, user_id: int, thirty_days_ago: datetime) -> dict:
+    # One grouped aggregate; only a row per (status, source) comes back
+    groups = db.query(
+        Order.status,
+        Order.source,
+        func.count(Order.id),
+        func.coalesce(func.sum(Order.total_amount), 0)
+    ).filter(
         Order.user_id == user_id,
         Order.order_date >= thirty_days_ago
-    ).all()
+    ).group_by(Order.status, Order.source).all()
     
-    total_orders = len(orders)
-    total_revenue = sum(order.total_amount for order in orders)
+    total_orders = sum(count for _, _, count, _ in groups)
+    total_revenue = sum(revenue for _, _, _, revenue in groups)
     avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
     
-    # Count by status
+    # Count by status and by source
     status_counts = {}
-    for order in orders:
-        status_counts[order.status.value] = status_counts.get(order.status.value, 0) + 1
-    
-    # Count by source
     source_counts = {}
-    for order in orders:
-        source_counts[order.source.value] = source_counts.get(order.source.value, 0) + 1
+    for status, source, count, _ in groups:
+        status_counts[status.value] = status_counts.get(status.value, 0) + count
+        source_counts[source.value] = source_counts.get(source.value, 0) + count
     
     return {
         "total_orders": total_orders,
@@ -140,42 +298,46 @@ def get_last_30_days_stats(
 
 
 @router.get("/stats/over-time", response_model=dict)
-def get_orders_over_time(
+async def get_orders_over_time(
+    request: Request,
+    response: Response,
     months: int = Query(12, ge=1, le=24, description="Number of months to look back"),
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Get order statistics over time grouped by month and channel"""
-    from datetime import datetime, timedelta, timezone, date
-    from collections import defaultdict
-    
-    user_id = get_current_user_id(db, session)
-    # Calculate start date based on months
-    start_date = datetime.now(timezone.utc) - timedelta(days=months * 30)
-    
-    # Get all orders in the date range
-    orders = db.query(Order).filter(
-        Order.user_id == user_id,
-        Order.order_date >= start_date
+    user_id = await get_current_user_id_async(db, session)
+    # Window covers the current calendar month and the (months - 1) before it
+    now = datetime.now(timezone.utc)
+    start_index = now.year * 12 + now.month - 1 - (months - 1)
+    start_month = date(start_index // 12, start_index % 12 + 1, 1)
+    return await run_db(
+        db, cached_response, request, response, user_id, ("over-time", months, start_month),
+        lambda db: _orders_over_time(db, user_id, months, start_month)
+    )
+
+
+def _orders_over_time(db: Session, user_id: int, months: int, start_month: date) -> dict:
+    # At most one rollup row per month, source and currency
+    rollups = db.query(
+        OrderMonthlyRollup.month,
+        OrderMonthlyRollup.source,
+        OrderMonthlyRollup.order_count,
+        OrderMonthlyRollup.revenue
+    ).filter(
+        OrderMonthlyRollup.user_id == user_id,
+        OrderMonthlyRollup.month >= start_month,
+        OrderMonthlyRollup.order_count != 0
     ).all()
     
     # Organize data by month and source
     data_by_month = defaultdict(lambda: {'etsy': {'orders': 0, 'revenue': 0}, 'tiktok_shop': {'orders': 0, 'revenue': 0}})
     
-    for order in orders:
-        # Extract date part (without time)
-        order_date = order.order_date.date() if hasattr(order.order_date, 'date') else order.order_date
-        if isinstance(order_date, str):
-            order_date = datetime.fromisoformat(order_date.replace('Z', '+00:00')).date()
-        elif not isinstance(order_date, date):
-            order_date = datetime.fromtimestamp(order_date).date() if isinstance(order_date, (int, float)) else date.today()
-        
+    for month_date, source, order_count, revenue in rollups:
         # Create month key (YYYY-MM format)
-        month_key = f"{order_date.year}-{order_date.month:02d}"
-        source = order.source.value
-        
-        data_by_month[month_key][source]['orders'] += 1
-        data_by_month[month_key][source]['revenue'] += order.total_amount
+        month_key = f"{month_date.year}-{month_date.month:02d}"
+        data_by_month[month_key][source.value]['orders'] += order_count
+        data_by_month[month_key][source.value]['revenue'] += revenue
     
     # Convert to list format for frontend, sorted by month
     chart_data = []
@@ -200,61 +362,233 @@ def get_orders_over_time(
     }
 
 
+EXPORT_FIELDS = list(OrderSchema.model_fields)
+
+
+def _csv_value(value):
+    """Flatten a column value for a CSV cell (JSON columns are embedded as JSON)"""
+    if isinstance(value, (dict, list)):
+        return orjson.dumps(value).decode()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _export_chunks(
+    user_id: int,
+    export_format: str,
+    gzip_output: bool,
+    filters: dict
+) -> Iterator[bytes]:
+    """Stream matching orders in batches from a server-side cursor"""
+    # The request's session is closed once the endpoint returns, so the stream reads through its own
+    db = SessionLocal()
+    compressor = zlib.compressobj(wbits=31) if gzip_output else None
+    try:
+        query = _filter_orders(
+            db.query(*[getattr(Order, field) for field in EXPORT_FIELDS]).filter(Order.user_id == user_id),
+            user_id,
+            **filters
+        ).order_by(Order.order_date.desc(), Order.id.desc())
+        # yield_per streams from a server-side cursor and fetches one batch at a time
+        result = db.execute(query.statement.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+
+        def encode(chunk: bytes) -> bytes:
+            return compressor.compress(chunk) if compressor else chunk
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == "csv":
+            writer.writerow(EXPORT_FIELDS)
+            # Send the header straight away so the download starts before the first batch is read
+            yield encode(buffer.getvalue().encode())
+            buffer.seek(0)
+            buffer.truncate()
+
+        for batch in result.partitions():
+            if export_format == "csv":
+                writer.writerows([_csv_value(value) for value in row] for row in batch)
+                chunk = buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                chunk = b"".join(
+                    orjson.dumps(dict(zip(EXPORT_FIELDS, row))) + b"\n" for row in batch
+                )
+            yield encode(chunk)
+
+        if compressor:
+            yield compressor.flush()
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_orders(
+    request: Request,
+    format: Literal["csv", "ndjson"] = Query("csv", description="csv or ndjson (one JSON order per line)"),
+    source: Optional[OrderSource] = None,
+    status: Optional[OrderStatus] = None,
+    search: Optional[str] = Query(None, description="Search in customer name, email, external_id or item titles"),
+    currency: Optional[str] = Query(None, description="Filter by currency code"),
+    min_amount: Optional[float] = Query(None, ge=0, description="Minimum order amount"),
+    max_amount: Optional[float] = Query(None, ge=0, description="Maximum order amount"),
+    date_from: Optional[str] = Query(None, description="Filter orders from this date (YYYY-MM-DD)"),
+    date_to: Optional[str] = Query(None, description="Filter orders to this date (YYYY-MM-DD)"),
+    db: Session = Depends(get_db),
+    session: SessionContainer = Depends(get_session)
+):
+    """Stream all of the authenticated user's orders matching the list filters as CSV or NDJSON"""
+    user_id = get_current_user_id(db, session)
+    filters = {
+        "source": source,
+        "status": status,
+        "search": search,
+        "currency": currency,
+        "min_amount": min_amount,
+        "max_amount": max_amount,
+        "date_from": date_from,
+        "date_to": date_to,
+    }
+
+    gzip_output = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {"Content-Disposition": f'attachment; filename="orders.{format}"'}
+    if gzip_output:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+
+    return StreamingResponse(
+        _export_chunks(user_id, format, gzip_output, filters),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers=headers
+    )
+
+
+@router.post("/bulk", response_model=OrderBulkResponse)
+async def create_orders_bulk(
+    body: OrderBulkCreate,
+    db: DbSession = Depends(get_request_db),
+    session: SessionContainer = Depends(get_session)
+):
+    """Create many orders in one transaction; orders that already exist are skipped"""
+    user_id = await get_current_user_id_async(db, session)
+    
+    def create(db: Session):
+        results = bulk_create_orders(db, user_id, body.orders)
+        db.commit()
+        return results
+    
+    results = await run_db(db, create)
+    succeeded = sum(1 for result in results if result["result"] == "created")
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+
+@router.patch("/bulk", response_model=OrderBulkResponse)
+async def update_orders_bulk(
+    body: OrderBulkUpdate,
+    db: DbSession = Depends(get_request_db),
+    session: SessionContainer = Depends(get_session)
+):
+    """Apply the same changes (e.g. status=shipped) to many orders in one transaction"""
+    user_id = await get_current_user_id_async(db, session)
+    
+    if not body.changes.dict(exclude_unset=True):
+        raise HTTPException(status_code=400, detail="No changes given")
+    
+    def update(db: Session):
+        results = bulk_update_orders(db, user_id, body.ids, body.changes)
+        db.commit()
+        return results
+    
+    results = await run_db(db, update)
+    succeeded = sum(1 for result in results if result["result"] == "updated")
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+
 @router.get("/{order_id}", response_model=OrderSchema)
-def get_order(
+async def get_order(
     order_id: int, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Get a specific order by ID (only if it belongs to the authenticated user)"""
-    user_id = get_current_user_id(db, session)
+    user_id = await get_current_user_id_async(db, session)
     
-    order = db.query(Order).filter(
-        Order.id == order_id,
-        Order.user_id == user_id
-    ).first()
+    order = await run_db(db, _get_user_order, user_id, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     return order
 
 
+def _get_user_order(db: Session, user_id: int, order_id: int, for_update: bool = False) -> Optional[Order]:
+    query = db.query(Order).filter(
+        Order.id == order_id,
+        Order.user_id == user_id
+    )
+    if for_update:
+        # The row is the "before" snapshot for counter deltas, so hold it until commit
+        query = query.with_for_update()
+    return query.first()
+
+
 @router.post("/", response_model=OrderSchema, status_code=201)
-def create_order(
+async def create_order(
     order: OrderCreate, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Create a new order for the authenticated user"""
-    user_id = get_current_user_id(db, session)
+    user_id = await get_current_user_id_async(db, session)
     
     order_data = order.dict()
     order_data["user_id"] = user_id
+    db_order = await run_db(db, _create_order, user_id, order_data)
+    if not db_order:
+        raise HTTPException(status_code=409, detail="Order already exists")
+    return db_order
+
+
+def _create_order(db: Session, user_id: int, order_data: dict) -> Optional[Order]:
     db_order = Order(**order_data)
     db.add(db_order)
-    db.commit()
+    record_order_changes(db, user_id, added=[order_snapshot(order_data)])
+    try:
+        db.commit()
+    except IntegrityError:
+        # Same (source, external_id) already stored for this user; drops the counter changes too
+        db.rollback()
+        return None
     db.refresh(db_order)
     return db_order
 
 
 @router.put("/{order_id}", response_model=OrderSchema)
-def update_order(
+async def update_order(
     order_id: int, 
     order_update: OrderUpdate, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Update an existing order (only if it belongs to the authenticated user)"""
-    user_id = get_current_user_id(db, session)
+    user_id = await get_current_user_id_async(db, session)
     
-    db_order = db.query(Order).filter(
-        Order.id == order_id,
-        Order.user_id == user_id
-    ).first()
+    db_order = await run_db(db, _update_order, user_id, order_id, order_update.dict(exclude_unset=True))
     if not db_order:
         raise HTTPException(status_code=404, detail="Order not found")
+    return db_order
+
+
+def _update_order(db: Session, user_id: int, order_id: int, changes: dict) -> Optional[Order]:
+    db_order = _get_user_order(db, user_id, order_id, for_update=True)
+    if not db_order:
+        return None
     
-    for key, value in order_update.dict(exclude_unset=True).items():
+    before = order_snapshot(db_order)
+    for key, value in changes.items():
         setattr(db_order, key, value)
+    record_order_changes(db, user_id, removed=[before], added=[order_snapshot(db_order)])
     
     db.commit()
     db.refresh(db_order)
@@ -262,22 +596,25 @@ def update_order(
 
 
 @router.delete("/{order_id}", status_code=204)
-def delete_order(
+async def delete_order(
     order_id: int, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Delete an order (only if it belongs to the authenticated user)"""
-    user_id = get_current_user_id(db, session)
+    user_id = await get_current_user_id_async(db, session)
     
-    db_order = db.query(Order).filter(
-        Order.id == order_id,
-        Order.user_id == user_id
-    ).first()
-    if not db_order:
+    if not await run_db(db, _delete_order, user_id, order_id):
         raise HTTPException(status_code=404, detail="Order not found")
+    return None
+
+
+def _delete_order(db: Session, user_id: int, order_id: int) -> bool:
+    db_order = _get_user_order(db, user_id, order_id, for_update=True)
+    if not db_order:
+        return False
     
+    record_order_changes(db, user_id, removed=[order_snapshot(db_order)])
     db.delete(db_order)
     db.commit()
-    return None
-
+    return True
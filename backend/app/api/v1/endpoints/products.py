@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.core.database import get_db
+from app.core.database import DbSession, get_request_db, run_db
 from app.core.auth import get_session
-from app.core.user import get_current_user_id
+from app.core.serialization import serialize_rows
+from app.core.user import get_current_user_id_async
 from app.models.product import Product, ProductStatus
 from app.schemas.product import Product as ProductSchema, ProductCreate, ProductUpdate
 from supertokens_python.recipe.session import SessionContainer
@@ -12,54 +14,67 @@ router = APIRouter()
 
 
 @router.get("/", response_model=List[ProductSchema])
-def get_products(
+async def get_products(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     status: Optional[ProductStatus] = None,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Get all products for the authenticated user with optional filtering"""
-    user_id = get_current_user_id(db, session)
+    user_id = await get_current_user_id_async(db, session)
     
+    return ORJSONResponse(await run_db(db, _list_products, user_id, skip, limit, status))
+
+
+def _list_products(db: Session, user_id: int, skip: int, limit: int, status: Optional[ProductStatus]) -> list:
     query = db.query(Product).filter(Product.user_id == user_id)
     
     if status:
         query = query.filter(Product.status == status)
     
     products = query.offset(skip).limit(limit).all()
-    return products
+    # Encode DB rows directly rather than validating each through ProductSchema
+    return serialize_rows(products, ProductSchema)
 
 
 @router.get("/{product_id}", response_model=ProductSchema)
-def get_product(
+async def get_product(
     product_id: int, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Get a specific product by ID (only if it belongs to the authenticated user)"""
-    user_id = get_current_user_id(db, session)
+    user_id = await get_current_user_id_async(db, session)
     
-    product = db.query(Product).filter(
-        Product.id == product_id,
-        Product.user_id == user_id
-    ).first()
+    product = await run_db(db, _get_user_product, user_id, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
 
 
+def _get_user_product(db: Session, user_id: int, product_id: int) -> Optional[Product]:
+    return db.query(Product).filter(
+        Product.id == product_id,
+        Product.user_id == user_id
+    ).first()
+
+
 @router.post("/", response_model=ProductSchema, status_code=201)
-def create_product(
+async def create_product(
     product: ProductCreate, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Create a new product for the authenticated user"""
-    user_id = get_current_user_id(db, session)
+    user_id = await get_current_user_id_async(db, session)
     
     product_data = product.dict()
     product_data["user_id"] = user_id
+    return await run_db(db, _create_product, product_data)
+
+
+def _create_product(db: Session, product_data: dict) -> Product:
     db_product = Product(**product_data)
     db.add(db_product)
     db.commit()
@@ -68,23 +83,27 @@ def create_product(
 
 
 @router.put("/{product_id}", response_model=ProductSchema)
-def update_product(
+async def update_product(
     product_id: int, 
     product_update: ProductUpdate, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Update an existing product (only if it belongs to the authenticated user)"""
-    user_id = get_current_user_id(db, session)
+    user_id = await get_current_user_id_async(db, session)
     
-    db_product = db.query(Product).filter(
-        Product.id == product_id,
-        Product.user_id == user_id
-    ).first()
+    db_product = await run_db(db, _update_product, user_id, product_id, product_update.dict(exclude_unset=True))
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
+    return db_product
+
+
+def _update_product(db: Session, user_id: int, product_id: int, changes: dict) -> Optional[Product]:
+    db_product = _get_user_product(db, user_id, product_id)
+    if not db_product:
+        return None
     
-    for key, value in product_update.dict(exclude_unset=True).items():
+    for key, value in changes.items():
         setattr(db_product, key, value)
     
     db.commit()
@@ -93,22 +112,24 @@ def update_product(
 
 
 @router.delete("/{product_id}", status_code=204)
-def delete_product(
+async def delete_product(
     product_id: int, 
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
     """Delete a product (only if it belongs to the authenticated user)"""
-    user_id = get_current_user_id(db, session)
+    user_id = await get_current_user_id_async(db, session)
     
-    db_product = db.query(Product).filter(
-        Product.id == product_id,
-        Product.user_id == user_id
-    ).first()
-    if not db_product:
+    if not await run_db(db, _delete_product, user_id, product_id):
         raise HTTPException(status_code=404, detail="Product not found")
+    return None
+
+
+def _delete_product(db: Session, user_id: int, product_id: int) -> bool:
+    db_product = _get_user_product(db, user_id, product_id)
+    if not db_product:
+        return False
     
     db.delete(db_product)
     db.commit()
-    return None
-
+    return True
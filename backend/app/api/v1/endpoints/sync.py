@@ -1,12 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from app.core.database import get_db
+from app.core.database import DbSession, get_request_db, run_db
 from app.core.auth import get_session
-from app.core.user import get_current_user_id
-from app.models.sync_log import SyncLog, SyncType, SyncStatus
+from app.core.user import get_current_user_id_async
+from app.models.sync_log import SyncLog, SyncType
 from app.schemas.sync import SyncLog as SyncLogSchema, SyncRequest
-from app.services.sync_service import SyncService
+from app.services.job_queue import enqueue_sync_job
 from supertokens_python.recipe.session import SessionContainer
 
 router = APIRouter()
@@ -15,81 +15,60 @@ router = APIRouter()
 @router.post("/orders/import", response_model=SyncLogSchema)
 async def sync_orders_import(
     sync_request: SyncRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
-    """Import orders from Etsy or TikTok Shop for the authenticated user"""
-    user_id = get_current_user_id(db, session)
-    sync_service = SyncService(db, user_id=user_id)
+    """Queue an order import from Etsy or TikTok Shop for the authenticated user"""
+    user_id = await get_current_user_id_async(db, session)
     
-    # Create sync log
-    sync_log = SyncLog(
+    # Picked up by a sync worker process (python -m app.worker)
+    return await run_db(
+        db,
+        enqueue_sync_job,
+        user_id=user_id,
         sync_type=SyncType.ORDER_IMPORT,
-        status=SyncStatus.PENDING,
-        source=sync_request.source
-    )
-    db.add(sync_log)
-    db.commit()
-    db.refresh(sync_log)
-    
-    # Run sync in background
-    background_tasks.add_task(
-        sync_service.import_orders,
-        sync_log.id,
-        sync_request.source
+        source=sync_request.source,
+        payload={"full_resync": sync_request.full_resync}
     )
-    
-    return sync_log
 
 
 @router.post("/products/export", response_model=SyncLogSchema)
 async def sync_products_export(
     sync_request: SyncRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: DbSession = Depends(get_request_db),
     session: SessionContainer = Depends(get_session)
 ):
-    """Export products to Etsy or TikTok Shop for the authenticated user"""
-    user_id = get_current_user_id(db, session)
-    sync_service = SyncService(db, user_id=user_id)
+    """Queue a product export to Etsy or TikTok Shop for the authenticated user"""
+    user_id = await get_current_user_id_async(db, session)
     
-    # Create sync log
-    sync_log = SyncLog(
+    # Picked up by a sync worker process (python -m app.worker)
+    return await run_db(
+        db,
+        enqueue_sync_job,
+        user_id=user_id,
         sync_type=SyncType.PRODUCT_EXPORT,
-        status=SyncStatus.PENDING,
         source=sync_request.source
     )
-    db.add(sync_log)
-    db.commit()
-    db.refresh(sync_log)
-    
-    # Run sync in background
-    background_tasks.add_task(
-        sync_service.export_products,
-        sync_log.id,
-        sync_request.source
-    )
-    
-    return sync_log
 
 
 @router.get("/logs", response_model=List[SyncLogSchema])
-def get_sync_logs(
+async def get_sync_logs(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: DbSession = Depends(get_request_db)
 ):
     """Get sync logs"""
-    logs = db.query(SyncLog).order_by(SyncLog.started_at.desc()).offset(skip).limit(limit).all()
-    return logs
+    return await run_db(db, _list_sync_logs, skip, limit)
+
+
+def _list_sync_logs(db: Session, skip: int, limit: int) -> List[SyncLog]:
+    return db.query(SyncLog).order_by(SyncLog.started_at.desc()).offset(skip).limit(limit).all()
 
 
 @router.get("/logs/{log_id}", response_model=SyncLogSchema)
-def get_sync_log(log_id: int, db: Session = Depends(get_db)):
+async def get_sync_log(log_id: int, db: DbSession = Depends(get_request_db)):
     """Get a specific sync log"""
-    log = db.query(SyncLog).filter(SyncLog.id == log_id).first()
+    log = await run_db(db, lambda db: db.query(SyncLog).filter(SyncLog.id == log_id).first())
     if not log:
         raise HTTPException(status_code=404, detail="Sync log not found")
     return log
-
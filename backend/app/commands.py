@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Maintenance commands
+
+    python -m app.commands rebuild-counters [--user-id 1]
+    python -m app.commands rebuild-rollups [--user-id 1]
+"""
+import argparse
+from app.core.database import SessionLocal
+from app.services.order_stats import rebuild_monthly_rollups, rebuild_order_counters
+
+
+def rebuild_counters(args):
+    db = SessionLocal()
+    try:
+        rows = rebuild_order_counters(db, user_id=args.user_id)
+        print(f"Rebuilt {rows} order counters")
+    finally:
+        db.close()
+
+
+def rebuild_rollups(args):
+    db = SessionLocal()
+    try:
+        rows = rebuild_monthly_rollups(db, user_id=args.user_id)
+        print(f"Rebuilt {rows} monthly order rollups")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Order tracker maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    counters = subparsers.add_parser("rebuild-counters", help="Recompute per-user order counters from the orders table")
+    counters.add_argument("--user-id", type=int, default=None, help="Only rebuild this user's counters")
+    counters.set_defaults(func=rebuild_counters)
+
+    rollups = subparsers.add_parser("rebuild-rollups", help="Recompute monthly order rollups from the orders table")
+    rollups.add_argument("--user-id", type=int, default=None, help="Only rebuild this user's rollups")
+    rollups.set_defaults(func=rebuild_rollups)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,27 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./order_tracker.db"
+    DATABASE_ASYNC: bool = False  # Serve API requests and syncs through an asyncpg/aiosqlite engine
+    ASYNC_DATABASE_URL: Optional[str] = None  # Defaults to DATABASE_URL with the async driver swapped in
+    # Connection pool (in-memory SQLite keeps SQLAlchemy's defaults). Applies per process and per engine
+    DB_POOL_SIZE: int = 10  # Connections kept open
+    DB_MAX_OVERFLOW: int = 10  # Extra connections opened under load, closed once returned
+    DB_POOL_TIMEOUT: float = 10.0  # Seconds to wait for a free connection before failing
+    DB_POOL_RECYCLE: int = 1800  # Replace connections older than this (seconds, -1 to disable)
+    DB_POOL_PRE_PING: bool = True  # Test connections on checkout so stale ones are replaced, not handed out
+    # SQLite profile, applied to every connection when DATABASE_URL is SQLite
+    SQLITE_PROFILE_ENABLED: bool = True
+    SQLITE_JOURNAL_MODE: str = "WAL"  # Readers no longer block on the writer
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # Safe with WAL; fsyncs at checkpoints instead of every commit
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # Wait this long for the write lock before "database is locked"
+    SQLITE_MMAP_SIZE: int = 268435456  # Bytes of the database file read through mmap (256 MiB)
+    SQLITE_CACHE_SIZE: int = -65536  # Page cache per connection; negative means KiB (64 MiB)
+    SQLITE_TEMP_STORE: str = "MEMORY"  # Temp tables and sort spills stay in memory
+    SQLITE_OPTIMIZE_INTERVAL: int = 3600  # Seconds between PRAGMA optimize runs from the worker and scheduler (0 to disable)
     
     # Security
     SECRET_KEY: str = "your-secret-key-change-in-production"
@@ -15,9 +32,54 @@ class Settings(BaseSettings):
     ETSY_API_KEY: Optional[str] = None
     ETSY_API_SECRET: Optional[str] = None
     ETSY_REDIRECT_URI: Optional[str] = "http://localhost:8000/api/v1/auth/etsy/callback"
+    ETSY_FETCH_CONCURRENCY: int = 5  # Receipt pages requested in parallel during a sync
+    ETSY_RATE_LIMIT_PER_SECOND: float = 10  # Per API key
+    ETSY_RATE_LIMIT_PER_DAY: int = 10000  # Per API key
+    ETSY_SHOP_RATE_LIMIT_PER_SECOND: float = 5  # Per shop, so one large sync can't starve the others
+    ETSY_RATE_LIMIT_PROCESSES: int = 1  # Processes calling Etsy with this key (API + sync workers); each keeps to an equal share of the limits above
+    ETSY_MAX_QUOTA_WAIT: float = 60.0  # Fail instead of waiting longer than this for quota
+    ETSY_MAX_RETRIES: int = 5  # Retries for 429, 5xx and connection errors
+    ETSY_RETRY_BACKOFF_BASE: float = 0.5
+    ETSY_RETRY_BACKOFF_MAX: float = 30.0
+    TOKEN_CACHE_TTL_SECONDS: int = 300  # Longest an OAuth access token is served from memory
+    TOKEN_EXPIRY_SKEW_SECONDS: int = 60  # Stop caching a token this long before it expires
+    TOKEN_VERSION_CHECK_SECONDS: int = 30  # Serve a cached token this long before re-checking its stored version
     TIKTOK_SHOP_API_KEY: Optional[str] = None
     TIKTOK_SHOP_API_SECRET: Optional[str] = None
     
+    # Outbound HTTP (shared client for marketplace APIs)
+    HTTP2_ENABLED: bool = True
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0  # Seconds an idle connection is kept open
+    HTTP_TIMEOUT: float = 30.0
+    HTTP_CONNECT_TIMEOUT: float = 10.0
+    HTTP_POOL_TIMEOUT: float = 10.0  # Seconds to wait for a free connection
+    
+    # Sync
+    SYNC_BATCH_SIZE: int = 100  # Orders fetched and committed per page (Etsy allows at most 100)
+    SYNC_CURSOR_OVERLAP_SECONDS: int = 900  # Re-fetch window before the cursor to catch late updates
+    SYNC_WORKER_CONCURRENCY: int = 4  # Jobs run at once by each worker process
+    SYNC_WORKER_POLL_INTERVAL: float = 2.0  # Seconds between queue polls when idle
+    SYNC_JOB_HEARTBEAT_SECONDS: int = 15
+    SYNC_JOB_VISIBILITY_TIMEOUT: int = 120  # Jobs without a heartbeat for this long are reclaimed
+    SYNC_JOB_MAX_ATTEMPTS: int = 3
+    SYNC_JOB_RETRY_DELAY: int = 60  # Seconds before a failed job is retried
+    SYNC_MAX_CONCURRENT_JOBS: int = 20  # Across all workers
+    SYNC_MAX_CONCURRENT_PER_SOURCE: Dict[str, int] = {"etsy": 10, "tiktok_shop": 5}
+    SYNC_SCHEDULE_INTERVAL: int = 3600  # Seconds between scheduled syncs per user and source
+    SYNC_SCHEDULE_JITTER_SECONDS: int = 120  # Random delay added to each scheduled run
+    SYNC_SCHEDULE_TICK_SECONDS: int = 30  # How often the scheduler looks for due syncs
+    
+    # Response cache (dashboard stats)
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1000  # Least recently used entries are evicted beyond this
+    
+    # Exports
+    EXPORT_BATCH_SIZE: int = 1000  # Rows fetched from the server-side cursor and flushed per chunk
+    
+    # Monitoring
+    METRICS_ENABLED: bool = False  # Serve /metrics/* (pool and quota state) to signed-in users
+    
     # CORS
     FRONTEND_URL: str = "http://localhost:3000"
     
@@ -26,6 +88,7 @@ class Settings(BaseSettings):
     SUPERTOKENS_API_KEY: Optional[str] = None
     SUPERTOKENS_API_DOMAIN: str = "localhost"
     SUPERTOKENS_WEBSITE_DOMAIN: str = "http://localhost:3000"
+    USER_CACHE_TTL_SECONDS: int = 300  # How long a SuperTokens user ID -> local user ID mapping is kept in memory
     
     class Config:
         env_file = ".env"
@@ -1,13 +1,42 @@
-from sqlalchemy import create_engine
+from typing import Any, AsyncIterator, Callable, Optional, TypeVar, Union
+from sqlalchemy import Table, create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 from app.core.config import settings
+from app.core.db_pool import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_engine
+from app.core.sqlite import apply_sqlite_profile
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    return url.startswith("sqlite") and (url.split("://", 1)[1] in ("", "/", "/:memory:") or "mode=memory" in url)
+
+
+def _pool_options(url: str, is_async: bool = False) -> dict:
+    """Pool settings and checkout timing for every engine except in-memory SQLite"""
+    if _is_memory_sqlite(url):
+        # Each connection is its own database here, so SQLAlchemy's single-connection pool must stay
+        return {}
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
 
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
+    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {},
+    **_pool_options(settings.DATABASE_URL)
 )
+instrument_engine("sync", engine)
+if engine.dialect.name == "sqlite" and settings.SQLITE_PROFILE_ENABLED:
+    apply_sqlite_profile(engine)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -16,6 +45,78 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def _async_database_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its asyncio counterpart"""
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    if dialect == "postgresql":
+        return f"postgresql+asyncpg://{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    raise ValueError(f"No async driver configured for {dialect}; set ASYNC_DATABASE_URL")
+
+
+# Opt-in async engine (DATABASE_ASYNC); the sync engine stays available for
+# migrations, maintenance commands and the scheduler
+async_engine: Optional[AsyncEngine] = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+if settings.DATABASE_ASYNC:
+    async_database_url = settings.ASYNC_DATABASE_URL or _async_database_url(settings.DATABASE_URL)
+    async_engine = create_async_engine(async_database_url, **_pool_options(async_database_url, is_async=True))
+    instrument_engine("async", async_engine.sync_engine)
+    if async_engine.dialect.name == "sqlite" and settings.SQLITE_PROFILE_ENABLED:
+        apply_sqlite_profile(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Session handed to endpoints and services: AsyncSession in async mode, Session otherwise
+DbSession = Union[Session, AsyncSession]
+
+T = TypeVar("T")
+
+
+def dialect_insert(db: Session, table: Table):
+    """INSERT construct supporting on_conflict_do_update for the session's database"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on {dialect}")
+    return insert(table)
+
+
+async def run_db(db: DbSession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run sync ORM code without blocking the event loop
+
+    fn receives a sync Session as its first argument. On an AsyncSession it runs
+    through run_sync over the async driver; on a plain Session it runs in the threadpool.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def dispose_async_engine():
+    """Close the async engine's pooled connections (aiosqlite keeps a thread per connection)"""
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+def new_session() -> DbSession:
+    """Session for work outside a request (e.g. sync workers), async when enabled"""
+    if AsyncSessionLocal is not None:
+        return AsyncSessionLocal()
+    return SessionLocal()
+
+
+async def close_session(db: DbSession):
+    if isinstance(db, AsyncSession):
+        await db.close()
+    else:
+        await run_in_threadpool(db.close)
+
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
@@ -24,3 +125,20 @@ def get_db():
     finally:
         db.close()
 
+
+# Dependency to get an async database session (requires DATABASE_ASYNC)
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database mode is disabled; set DATABASE_ASYNC=true")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependency for async endpoints: an AsyncSession in async mode, otherwise a
+# regular Session whose work is pushed to the threadpool by run_db
+async def get_request_db() -> AsyncIterator[DbSession]:
+    db = new_session()
+    try:
+        yield db
+    finally:
+        await close_session(db)
@@ -0,0 +1,177 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Recent checkouts kept for the wait-time percentiles
+WAIT_SAMPLE_SIZE = 1000
+
+
+def _percentile(samples: list, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class PoolMetrics:
+    """Checkout waits, hold times and connection churn for one engine's pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+        self.checkins = 0
+        self.peak_in_use = 0
+        self.peak_overflow = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            self._waits.append(seconds)
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_checkout(self, in_use: int, overflow: int):
+        with self._lock:
+            self.checkouts += 1
+            self.peak_in_use = max(self.peak_in_use, in_use)
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def record_checkin(self, held: float):
+        with self._lock:
+            self.checkins += 1
+            self.hold_total += held
+            self.hold_max = max(self.hold_max, held)
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_invalidate(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            waited = len(self._waits)
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "peak_in_use": self.peak_in_use,
+                "peak_overflow": self.peak_overflow,
+                "wait_ms": {
+                    "avg": round(1000 * sum(waits) / waited, 3) if waited else 0.0,
+                    "p50": round(1000 * _percentile(waits, 0.5), 3),
+                    "p95": round(1000 * _percentile(waits, 0.95), 3),
+                    "p99": round(1000 * _percentile(waits, 0.99), 3),
+                    "max": round(1000 * self.wait_max, 3),
+                    "total": round(1000 * self.wait_total, 3),
+                },
+                "hold_ms": {
+                    "avg": round(1000 * self.hold_total / self.checkins, 3) if self.checkins else 0.0,
+                    "max": round(1000 * self.hold_max, 3),
+                },
+            }
+
+
+class _TimedCheckoutMixin:
+    """Times how long callers wait for a connection, which no pool event covers"""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics:
+                self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        if self.metrics:
+            self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep reporting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+# Engine name -> (engine, metrics), reported by /metrics/db
+_engines: Dict[str, tuple] = {}
+
+
+def instrument_engine(name: str, engine: Engine) -> PoolMetrics:
+    """Attach pool event hooks to an engine and register it for get_db_pool_stats"""
+    metrics = PoolMetrics()
+    if isinstance(engine.pool, _TimedCheckoutMixin):
+        engine.pool.metrics = metrics
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        metrics.record_connect()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        pool = engine.pool
+        in_use = pool.checkedout() if hasattr(pool, "checkedout") else 0
+        overflow = max(0, pool.overflow()) if hasattr(pool, "overflow") else 0
+        metrics.record_checkout(in_use, overflow)
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            metrics.record_checkin(time.perf_counter() - checked_out_at)
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.record_invalidate()
+
+    _engines[name] = (engine, metrics)
+    return metrics
+
+
+def get_db_pool_stats() -> Dict[str, Any]:
+    """Snapshot of each database engine's connection pool for monitoring"""
+    stats = {}
+    for name, (engine, metrics) in _engines.items():
+        pool = engine.pool
+        pool_stats = {"pool_class": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            pool_stats.update({
+                "size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+                "checked_in": pool.checkedin(),
+                "in_use": pool.checkedout(),
+                "overflow": max(0, pool.overflow()),
+            })
+        pool_stats.update(metrics.snapshot())
+        stats[name] = pool_stats
+    return stats
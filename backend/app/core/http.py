@@ -0,0 +1,72 @@
+import httpx
+from typing import Any, Dict, Optional
+from app.core.config import settings
+
+# Application-wide client so marketplace calls reuse pooled keep-alive connections
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _create_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=settings.HTTP2_ENABLED,
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            settings.HTTP_TIMEOUT,
+            connect=settings.HTTP_CONNECT_TIMEOUT,
+            pool=settings.HTTP_POOL_TIMEOUT,
+        ),
+    )
+
+
+async def start_http_client():
+    """Create the shared client (called from the application lifespan)"""
+    global _client
+    if _client is None:
+        _client = _create_client()
+
+
+async def close_http_client():
+    """Close the shared client and its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# Dependency to get the shared HTTP client
+def get_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        # Created lazily for code running outside the web app lifespan
+        _client = _create_client()
+    return _client
+
+
+def get_http_pool_stats() -> Dict[str, Any]:
+    """Snapshot of the shared client's connection pool for monitoring"""
+    stats = {
+        "started": _client is not None,
+        "http2": settings.HTTP2_ENABLED,
+        "max_connections": settings.HTTP_MAX_CONNECTIONS,
+        "max_keepalive_connections": settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        "connections": 0,
+        "active": 0,
+        "idle": 0,
+        "waiting_requests": 0,
+    }
+    # httpx doesn't expose its pool publicly; every lookup is guarded so an upgrade only empties the stats
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return stats
+
+    idle = sum(1 for connection in connections if getattr(connection, "is_idle", lambda: False)())
+    stats["connections"] = len(connections)
+    stats["idle"] = idle
+    stats["active"] = len(connections) - idle
+    stats["waiting_requests"] = len(getattr(pool, "_requests", None) or [])
+    return stats
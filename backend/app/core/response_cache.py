@@ -0,0 +1,81 @@
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+from fastapi import Request, Response
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.user import User
+
+
+def get_data_version(db: Session, user_id: int) -> int:
+    """Current data version of a user's orders"""
+    return db.query(User.data_version).filter(User.id == user_id).scalar() or 0
+
+
+def bump_data_version(db: Session, user_id: int):
+    """Invalidate everything cached for a user (caller commits)"""
+    db.execute(
+        update(User).where(User.id == user_id).values(data_version=User.data_version + 1)
+    )
+
+
+class ResponseCache:
+    """In-process LRU cache of computed responses keyed by user and data version
+
+    A write bumps the user's version, so stale entries are never read again and
+    age out of the LRU instead of needing explicit invalidation.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int, Hashable], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, version: int, key: Hashable) -> Any:
+        with self._lock:
+            entry_key = (user_id, version, key)
+            if entry_key not in self._entries:
+                return None
+            self._entries.move_to_end(entry_key)
+            return self._entries[entry_key]
+
+    def set(self, user_id: int, version: int, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[(user_id, version, key)] = value
+            self._entries.move_to_end((user_id, version, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+def cached_response(
+    db: Session,
+    request: Request,
+    response: Response,
+    user_id: int,
+    key: Hashable,
+    compute: Callable[[Session], Dict[str, Any]]
+):
+    """Serve a per-user response from the cache, with an ETag for conditional requests"""
+    version = get_data_version(db, user_id)
+    etag = f'"{user_id}-{version}-{zlib.crc32(repr(key).encode()):08x}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    value = response_cache.get(user_id, version, key)
+    if value is None:
+        value = compute(db)
+        response_cache.set(user_id, version, key, value)
+    return value
@@ -0,0 +1,38 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Tuple, Type
+from pydantic import BaseModel, EmailStr, TypeAdapter
+
+# Field types whose validation rewrites the value (EmailStr lowercases the domain)
+NORMALIZING_TYPES = (EmailStr,)
+
+
+def _normalizes(annotation: Any) -> bool:
+    if annotation in NORMALIZING_TYPES:
+        return True
+    return any(_normalizes(arg) for arg in getattr(annotation, "__args__", ()))
+
+
+@lru_cache(maxsize=None)
+def _field_plan(schema: Type[BaseModel]) -> Tuple[Tuple[str, Any], ...]:
+    """(field, validator or None) per schema field; only normalizing fields are validated"""
+    return tuple(
+        (name, TypeAdapter(field.annotation).validate_python if _normalizes(field.annotation) else None)
+        for name, field in schema.model_fields.items()
+    )
+
+
+def serialize_rows(rows: Iterable[Any], schema: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """Plain dicts in the schema's field order, read straight off trusted DB rows
+
+    Skips per-row Pydantic validation except for fields whose type normalizes the
+    value, so the output matches the schema's; pair with ORJSONResponse, which
+    encodes the enums and datetimes these contain the same way the schema would.
+    """
+    plan = _field_plan(schema)
+    return [
+        {
+            field: validate(getattr(row, field)) if validate else getattr(row, field)
+            for field, validate in plan
+        }
+        for row in rows
+    ]
@@ -0,0 +1,64 @@
+import time
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+
+def sqlite_pragmas() -> dict:
+    """Per-connection PRAGMAs of the SQLite profile, from settings"""
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "temp_store": settings.SQLITE_TEMP_STORE,
+    }
+
+
+def apply_sqlite_profile(engine: Engine, pragmas: Optional[dict] = None):
+    """Set the profile's PRAGMAs on every new connection
+
+    WAL lets readers run alongside the writer; busy_timeout makes writers queue
+    for the lock instead of failing with "database is locked".
+    """
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def optimize_sqlite(engine: Engine):
+    """Refresh query planner statistics where SQLite judges them stale"""
+    with engine.connect() as connection:
+        connection.exec_driver_sql("PRAGMA optimize")
+
+
+class SqliteOptimizer:
+    """Runs PRAGMA optimize at most once per SQLITE_OPTIMIZE_INTERVAL from a polling loop"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.enabled = engine.dialect.name == "sqlite" and settings.SQLITE_OPTIMIZE_INTERVAL > 0
+        self._last_run = time.monotonic()
+
+    def due(self) -> bool:
+        return self.enabled and time.monotonic() - self._last_run >= settings.SQLITE_OPTIMIZE_INTERVAL
+
+    def run(self):
+        self._last_run = time.monotonic()
+        try:
+            optimize_sqlite(self.engine)
+        except Exception as e:
+            print(f"PRAGMA optimize failed: {e}")
+
+    def maybe_run(self):
+        if self.due():
+            self.run()
@@ -1,38 +1,76 @@
 from sqlalchemy.orm import Session
 from app.models.user import User
 from supertokens_python.recipe.session import SessionContainer
-from typing import Optional
+from typing import Dict, Optional, Tuple
+import threading
+import time
 import httpx
 from app.core.config import settings
+from app.core.database import DbSession, run_db
+from app.core.http import get_http_client
+
+# Email given to users whose real address couldn't be fetched from SuperTokens
+PLACEHOLDER_EMAIL_DOMAIN = "@supertokens.local"
+
+
+class UserIdCache:
+    """In-process TTL cache of SuperTokens user ID -> local user ID"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, supertokens_user_id: str) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(supertokens_user_id)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[supertokens_user_id]
+                return None
+            return entry[0]
+
+    def set(self, supertokens_user_id: str, user_id: int):
+        with self._lock:
+            self._entries[supertokens_user_id] = (user_id, time.monotonic() + settings.USER_CACHE_TTL_SECONDS)
+
+    def invalidate(self, supertokens_user_id: str):
+        with self._lock:
+            self._entries.pop(supertokens_user_id, None)
+
+
+user_id_cache = UserIdCache()
+
+
+def _supertokens_user_request(user_id: str) -> Tuple[str, Dict[str, str], Dict[str, str]]:
+    """URL, query params and headers for the SuperTokens core user lookup"""
+    connection_uri = settings.SUPERTOKENS_CONNECTION_URI.rstrip('/')
+    headers = {}
+    if settings.SUPERTOKENS_API_KEY:
+        headers["api-key"] = settings.SUPERTOKENS_API_KEY
+    return f"{connection_uri}/recipe/user", {"userId": user_id, "recipeId": "emailpassword"}, headers
+
+
+def _email_from_supertokens_response(response: httpx.Response) -> Optional[str]:
+    if response.status_code == 200:
+        data = response.json()
+        if data.get("status") == "OK":
+            user_data = data.get("user", {})
+            # Email is typically in user.emails[0] or user.email
+            if "emails" in user_data and user_data["emails"]:
+                return user_data["emails"][0]
+            elif "email" in user_data:
+                return user_data["email"]
+    return None
 
 
 def _get_user_email_from_supertokens(user_id: str) -> Optional[str]:
     """Get user email from SuperTokens by making direct API call to core"""
     try:
         # Make direct HTTP request to SuperTokens core API
-        connection_uri = settings.SUPERTOKENS_CONNECTION_URI.rstrip('/')
-        url = f"{connection_uri}/recipe/user"
-        
-        headers = {}
-        if settings.SUPERTOKENS_API_KEY:
-            headers["api-key"] = settings.SUPERTOKENS_API_KEY
-        
-        response = httpx.get(
-            url,
-            params={"userId": user_id, "recipeId": "emailpassword"},
-            headers=headers,
-            timeout=5.0
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("status") == "OK":
-                user_data = data.get("user", {})
-                # Email is typically in user.emails[0] or user.email
-                if "emails" in user_data and user_data["emails"]:
-                    return user_data["emails"][0]
-                elif "email" in user_data:
-                    return user_data["email"]
+        url, params, headers = _supertokens_user_request(user_id)
+        response = httpx.get(url, params=params, headers=headers, timeout=5.0)
+        return _email_from_supertokens_response(response)
     except Exception as e:
         print(f"Error getting user email from SuperTokens: {e}")
         import traceback
@@ -41,21 +79,34 @@ def _get_user_email_from_supertokens(user_id: str) -> Optional[str]:
     return None
 
 
-def get_or_create_user(db: Session, session: SessionContainer) -> User:
-    """Get or create a user from SuperTokens session"""
-    supertokens_user_id = session.get_user_id()
+async def _get_user_email_from_supertokens_async(user_id: str) -> Optional[str]:
+    """Non-blocking SuperTokens email lookup over the shared pooled client"""
+    try:
+        url, params, headers = _supertokens_user_request(user_id)
+        response = await get_http_client().get(url, params=params, headers=headers, timeout=5.0)
+        return _email_from_supertokens_response(response)
+    except Exception as e:
+        print(f"Error getting user email from SuperTokens: {e}")
     
-    # Try to get existing user
-    user = db.query(User).filter(
+    return None
+
+
+def _find_user(db: Session, supertokens_user_id: str) -> Optional[User]:
+    return db.query(User).filter(
         User.supertokens_user_id == supertokens_user_id
     ).first()
-    
-    # Get email from SuperTokens (always try to get fresh email)
-    email = _get_user_email_from_supertokens(supertokens_user_id)
-    
+
+
+def _needs_email(user: Optional[User]) -> bool:
+    """Existing users only need SuperTokens while they still have a placeholder email"""
+    return user is None or user.email.endswith(PLACEHOLDER_EMAIL_DOMAIN)
+
+
+def _save_user(db: Session, supertokens_user_id: str, user: Optional[User], email: Optional[str]) -> User:
+    """Create the user, or replace a placeholder email once the real one is known"""
     # If user exists but has placeholder email, update it
     if user:
-        if email and user.email.endswith('@supertokens.local'):
+        if email:
             user.email = email
             db.commit()
             db.refresh(user)
@@ -65,7 +116,7 @@ def get_or_create_user(db: Session, session: SessionContainer) -> User:
     # Fallback if email couldn't be retrieved
     if not email:
         print(f"Warning: Could not retrieve email for user {supertokens_user_id}, using placeholder")
-        email = f"{supertokens_user_id}@supertokens.local"
+        email = f"{supertokens_user_id}{PLACEHOLDER_EMAIL_DOMAIN}"
     
     # Name will be set via the profile update endpoint after signup
     # For now, use email as a temporary name
@@ -81,8 +132,43 @@ def get_or_create_user(db: Session, session: SessionContainer) -> User:
     return user
 
 
+def get_or_create_user(db: Session, session: SessionContainer) -> User:
+    """Get or create a user from SuperTokens session"""
+    supertokens_user_id = session.get_user_id()
+    user = _find_user(db, supertokens_user_id)
+    if not _needs_email(user):
+        return user
+    
+    email = _get_user_email_from_supertokens(supertokens_user_id)
+    return _save_user(db, supertokens_user_id, user, email)
+
+
+async def get_or_create_user_async(db: DbSession, session: SessionContainer) -> User:
+    """get_or_create_user for async endpoints: DB work goes through run_db, SuperTokens over the async client"""
+    supertokens_user_id = session.get_user_id()
+    user = await run_db(db, _find_user, supertokens_user_id)
+    if not _needs_email(user):
+        return user
+    
+    email = await _get_user_email_from_supertokens_async(supertokens_user_id)
+    return await run_db(db, _save_user, supertokens_user_id, user, email)
+
+
 def get_current_user_id(db: Session, session: SessionContainer) -> Optional[int]:
     """Get the current user's database ID"""
-    user = get_or_create_user(db, session)
-    return user.id
+    supertokens_user_id = session.get_user_id()
+    user_id = user_id_cache.get(supertokens_user_id)
+    if user_id is None:
+        user_id = get_or_create_user(db, session).id
+        user_id_cache.set(supertokens_user_id, user_id)
+    return user_id
 
+
+async def get_current_user_id_async(db: DbSession, session: SessionContainer) -> Optional[int]:
+    """get_current_user_id for async endpoints, never blocking the event loop"""
+    supertokens_user_id = session.get_user_id()
+    user_id = user_id_cache.get(supertokens_user_id)
+    if user_id is None:
+        user_id = (await get_or_create_user_async(db, session)).id
+        user_id_cache.set(supertokens_user_id, user_id)
+    return user_id
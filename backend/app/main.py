@@ -1,8 +1,13 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 from app.core.config import settings
-from app.core.auth import supertokens_middleware
+from app.core.auth import get_session, supertokens_middleware
+from app.core.database import dispose_async_engine
+from app.core.db_pool import get_db_pool_stats
+from app.core.http import start_http_client, close_http_client, get_http_pool_stats
+from app.services.integrations.rate_limiter import etsy_rate_limiter
 from app.api.v1.api import api_router
 
 # Configure logging
@@ -11,10 +16,21 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared pooled HTTP client for marketplace API calls
+    await start_http_client()
+    yield
+    await close_http_client()
+    await dispose_async_engine()
+
+
 app = FastAPI(
     title="Order Tracker API",
     description="API for managing orders and products from Etsy and TikTok Shop",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # SuperTokens middleware (must be added before CORS)
@@ -43,3 +59,29 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+
+def _metrics_enabled():
+    # Internal pool and quota state; hidden unless explicitly turned on
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+metrics_router = APIRouter(prefix="/metrics", dependencies=[Depends(_metrics_enabled), Depends(get_session)])
+
+
+@metrics_router.get("/http")
+async def http_pool_metrics():
+    return get_http_pool_stats()
+
+
+@metrics_router.get("/db")
+async def db_pool_metrics():
+    return get_db_pool_stats()
+
+
+@metrics_router.get("/etsy-quota")
+async def etsy_quota_metrics():
+    return etsy_rate_limiter.quota(settings.ETSY_API_KEY or "")
+
+
+app.include_router(metrics_router)
@@ -1,9 +1,13 @@
 from app.models.order import Order
+from app.models.order_counter import OrderCounter
+from app.models.order_rollup import OrderMonthlyRollup
 from app.models.product import Product
 from app.models.sync_log import SyncLog
+from app.models.sync_cursor import SyncCursor
+from app.models.sync_job import SyncJob
 from app.models.oauth_token import OAuthToken
 from app.models.oauth_state import OAuthState
 from app.models.user import User
 
-__all__ = ["Order", "Product", "SyncLog", "OAuthToken", "OAuthState", "User"]
+__all__ = ["Order", "OrderCounter", "OrderMonthlyRollup", "Product", "SyncLog", "SyncCursor", "SyncJob", "OAuthToken", "OAuthState", "User"]
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -16,6 +16,7 @@ class OAuthToken(Base):
     expires_at = Column(DateTime, nullable=True)
     shop_id = Column(String, nullable=True, index=True)  # Etsy shop ID
     shop_name = Column(String, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))  # Bumped whenever the credentials change
     
     # Timestamps
     created_at = Column(DateTime, server_default=func.now())
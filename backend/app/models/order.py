@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Enum
+from typing import Any, Dict, List, Optional
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Enum, Index, Text, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -18,8 +19,27 @@ class OrderStatus(str, enum.Enum):
     CANCELLED = "cancelled"
 
 
+# Natural key of an imported order, used for upserts
+ORDER_UPSERT_KEY = ["user_id", "source", "external_id"]
+
+
+def build_search_text(
+    customer_name: Optional[str],
+    customer_email: Optional[str],
+    external_id: Optional[str],
+    items: Optional[List[Dict[str, Any]]]
+) -> str:
+    """Lowercased text the order search index is built from"""
+    parts = [customer_name, customer_email, external_id]
+    parts.extend(item.get("title") for item in items or [] if isinstance(item, dict))
+    return " ".join(str(part) for part in parts if part).lower()
+
+
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_user_source_external_id", *ORDER_UPSERT_KEY, unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -36,6 +56,7 @@ class Order(Base):
     total_amount = Column(Float, nullable=False)
     currency = Column(String, default="USD")
     items = Column(JSON)  # List of items with product references
+    search_text = Column(Text)  # Derived from the fields above, see build_search_text
     
     # Timestamps
     order_date = Column(DateTime, nullable=False)
@@ -46,3 +67,37 @@ class Order(Base):
     user = relationship("User", back_populates="orders")
     sync_logs = relationship("SyncLog", back_populates="order")
 
+
+# Serves the newest-first order list and its keyset pagination
+Index("ix_orders_user_order_date_id", Order.user_id, Order.order_date.desc(), Order.id.desc())
+
+
+@event.listens_for(Order, "before_insert")
+@event.listens_for(Order, "before_update")
+def _set_search_text(mapper, connection, target):
+    # Bulk inserts and upserts bypass this and must set search_text themselves
+    target.search_text = build_search_text(
+        target.customer_name, target.customer_email, target.external_id, target.items
+    )
+
+
+# Trigram search index: GIN on PostgreSQL, an FTS5 shadow table kept in step by triggers on SQLite
+for statement in (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_orders_search_text_trgm ON orders USING gin (search_text gin_trgm_ops)",
+):
+    event.listen(Order.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+
+for statement in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS orders_search USING fts5("
+    "search_text, content='orders', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS orders_search_ai AFTER INSERT ON orders BEGIN "
+    "INSERT INTO orders_search(rowid, search_text) VALUES (new.id, new.search_text); END",
+    "CREATE TRIGGER IF NOT EXISTS orders_search_ad AFTER DELETE ON orders BEGIN "
+    "INSERT INTO orders_search(orders_search, rowid, search_text) VALUES ('delete', old.id, old.search_text); END",
+    "CREATE TRIGGER IF NOT EXISTS orders_search_au AFTER UPDATE OF search_text ON orders BEGIN "
+    "INSERT INTO orders_search(orders_search, rowid, search_text) VALUES ('delete', old.id, old.search_text); "
+    "INSERT INTO orders_search(rowid, search_text) VALUES (new.id, new.search_text); END",
+):
+    event.listen(Order.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Order.__table__, "before_drop", DDL("DROP TABLE IF EXISTS orders_search").execute_if(dialect="sqlite"))
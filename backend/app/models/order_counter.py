@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, ForeignKey, Enum, Index
+from app.core.database import Base
+from app.models.order import OrderSource, OrderStatus
+
+
+class OrderCounter(Base):
+    """Number of orders per user, source and status, kept up to date on every order write"""
+    __tablename__ = "order_counters"
+    __table_args__ = (
+        Index("ix_order_counters_user_source_status", "user_id", "source", "status", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    source = Column(Enum(OrderSource), nullable=False)
+    status = Column(Enum(OrderStatus), nullable=False)
+    count = Column(Integer, default=0, nullable=False)
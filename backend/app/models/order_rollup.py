@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Enum, Index
+from app.core.database import Base
+from app.models.order import OrderSource
+
+
+class OrderMonthlyRollup(Base):
+    """Order count and revenue per user, calendar month, source and currency, kept up to date on every order write"""
+    __tablename__ = "order_monthly_rollups"
+    __table_args__ = (
+        Index("ix_order_monthly_rollups_user_month_source_currency", "user_id", "month", "source", "currency", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    month = Column(Date, nullable=False)  # First day of the month (UTC)
+    source = Column(Enum(OrderSource), nullable=False)
+    currency = Column(String, nullable=False)
+    order_count = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0, nullable=False)
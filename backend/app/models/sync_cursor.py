@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class SyncCursor(Base):
+    """High-water mark of the last successful order import per user and source"""
+    __tablename__ = "sync_cursors"
+    __table_args__ = (
+        Index("ix_sync_cursors_user_source", "user_id", "source", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    source = Column(String, nullable=False)  # "etsy" or "tiktok_shop"
+    
+    # Newest marketplace timestamps seen so far (naive UTC)
+    last_created_at = Column(DateTime, nullable=True)
+    last_updated_at = Column(DateTime, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
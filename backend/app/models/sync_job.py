@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, JSON, Index
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from app.core.database import Base
+from app.models.sync_log import SyncType, SyncStatus
+
+
+class SyncJob(Base):
+    """Queued sync run, claimed and executed by a worker process"""
+    __tablename__ = "sync_jobs"
+    __table_args__ = (
+        Index("ix_sync_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    sync_log_id = Column(Integer, ForeignKey("sync_logs.id"), nullable=False)
+    sync_type = Column(Enum(SyncType), nullable=False)
+    source = Column(String, nullable=False)  # "etsy" or "tiktok_shop"
+    payload = Column(JSON)  # Extra arguments, e.g. {"full_resync": true}
+    
+    # Queue state
+    status = Column(Enum(SyncStatus), default=SyncStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    run_after = Column(DateTime, server_default=func.now(), nullable=False)
+    locked_by = Column(String, nullable=True)  # Worker currently running the job
+    heartbeat_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    finished_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    sync_log = relationship("SyncLog")
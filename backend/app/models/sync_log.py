@@ -26,6 +26,7 @@ class SyncLog(Base):
     sync_type = Column(Enum(SyncType), nullable=False)
     status = Column(Enum(SyncStatus), default=SyncStatus.PENDING)
     source = Column(String, nullable=False)  # "etsy" or "tiktok_shop"
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     
     # Related order (if applicable)
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=True)
@@ -35,6 +36,9 @@ class SyncLog(Base):
     records_processed = Column(Integer, default=0)
     records_successful = Column(Integer, default=0)
     records_failed = Column(Integer, default=0)
+    records_inserted = Column(Integer, default=0)
+    records_updated = Column(Integer, default=0)
+    records_unchanged = Column(Integer, default=0)
     error_message = Column(Text, nullable=True)
     
     # Timestamps
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -11,6 +11,7 @@ class User(Base):
     supertokens_user_id = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     name = Column(String, nullable=False)  # Required name field
+    data_version = Column(Integer, nullable=False, default=0, server_default=text("0"))  # Bumped on every order write
     
     # Timestamps
     created_at = Column(DateTime, server_default=func.now())
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Periodic sync scheduler
+
+Queues an order import for every user with a valid marketplace token once per
+SYNC_SCHEDULE_INTERVAL. Each user and source gets a fixed slot inside the
+interval so runs are spread out instead of all starting at the top of the
+hour. The queued jobs are run by the sync workers (python -m app.worker), which
+enforce the global and per-source concurrency caps. Run a single instance:
+
+    python -m app.scheduler
+"""
+import argparse
+import logging
+import random
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.core.sqlite import SqliteOptimizer
+from app.models.oauth_token import OAuthToken
+from app.models.sync_job import SyncJob
+from app.models.sync_log import SyncLog, SyncType, SyncStatus
+from app.services.job_queue import enqueue_sync_job
+
+logger = logging.getLogger("app.scheduler")
+
+
+def _slot_start(user_id: int, source: str, now: datetime) -> datetime:
+    """Start of the current schedule slot for a user and source"""
+    interval = settings.SYNC_SCHEDULE_INTERVAL
+    # Stable per-user offset so every user keeps the same place in the interval
+    offset = zlib.crc32(f"{user_id}:{source}".encode()) % interval
+    seconds_into_slot = (int(now.replace(tzinfo=timezone.utc).timestamp()) - offset) % interval
+    return now - timedelta(seconds=seconds_into_slot)
+
+
+def schedule_due_syncs(db: Session, now: Optional[datetime] = None) -> int:
+    """Queue an order import for every user and source whose slot has come round"""
+    now = now or datetime.utcnow()
+
+    connected = db.query(OAuthToken.user_id, OAuthToken.source).filter(
+        or_(OAuthToken.expires_at.is_(None), OAuthToken.expires_at > now)
+    ).distinct().all()
+    if not connected:
+        return 0
+
+    last_started = {
+        (user_id, source): started_at
+        for user_id, source, started_at in db.query(
+            SyncLog.user_id, SyncLog.source, func.max(SyncLog.started_at)
+        ).filter(
+            SyncLog.sync_type == SyncType.ORDER_IMPORT,
+            SyncLog.user_id.isnot(None)
+        ).group_by(SyncLog.user_id, SyncLog.source)
+    }
+
+    # Skip anyone whose previous sync is still queued or running
+    busy = set(
+        db.query(SyncLog.user_id, SyncLog.source).filter(
+            SyncLog.sync_type == SyncType.ORDER_IMPORT,
+            SyncLog.status == SyncStatus.IN_PROGRESS
+        ).all()
+    )
+    busy.update(
+        db.query(SyncJob.user_id, SyncJob.source).filter(
+            SyncJob.sync_type == SyncType.ORDER_IMPORT,
+            SyncJob.status.in_([SyncStatus.PENDING, SyncStatus.IN_PROGRESS])
+        ).all()
+    )
+
+    queued = 0
+    for user_id, source in connected:
+        if (user_id, source) in busy:
+            continue
+
+        slot_start = _slot_start(user_id, source, now)
+        last = last_started.get((user_id, source))
+        if last and last >= slot_start:
+            continue
+
+        if last is None or now - slot_start > timedelta(seconds=settings.SYNC_SCHEDULE_TICK_SECONDS * 2):
+            # Never synced or the slot was missed (e.g. scheduler downtime) -
+            # spread the catch-up over a whole interval instead of all at once
+            delay = random.uniform(0, settings.SYNC_SCHEDULE_INTERVAL)
+        else:
+            delay = random.uniform(0, settings.SYNC_SCHEDULE_JITTER_SECONDS)
+
+        enqueue_sync_job(
+            db,
+            user_id=user_id,
+            sync_type=SyncType.ORDER_IMPORT,
+            source=source,
+            payload={"scheduled": True},
+            run_after=now + timedelta(seconds=delay)
+        )
+        queued += 1
+
+    return queued
+
+
+def run_scheduler(tick_seconds: int):
+    logger.info("Sync scheduler started (interval %ss)", settings.SYNC_SCHEDULE_INTERVAL)
+    # Also run from the sync workers; a few extra runs per interval are cheap
+    sqlite_optimizer = SqliteOptimizer(engine)
+    while True:
+        db = SessionLocal()
+        try:
+            queued = schedule_due_syncs(db)
+            if queued:
+                logger.info("Queued %s scheduled syncs", queued)
+        except Exception as e:
+            db.rollback()
+            logger.warning("Scheduling failed: %s", e)
+        finally:
+            db.close()
+        sqlite_optimizer.maybe_run()
+        time.sleep(tick_seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue periodic order syncs")
+    parser.add_argument("--tick", type=int, default=settings.SYNC_SCHEDULE_TICK_SECONDS)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    try:
+        run_scheduler(args.tick)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Optional, List, Dict, Any, Literal
+from datetime import datetime, timezone
 from app.models.order import OrderSource, OrderStatus
 
 
@@ -17,6 +17,14 @@ class OrderBase(BaseModel):
     items: Optional[List[Dict[str, Any]]] = None
     order_date: datetime
 
+    @field_validator("order_date")
+    @classmethod
+    def _naive_utc(cls, value: datetime) -> datetime:
+        # Stored as naive UTC like synced orders, which the monthly rollups rely on
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
 
 class OrderCreate(OrderBase):
     pass
@@ -42,7 +50,34 @@ class Order(OrderBase):
 
 class OrdersResponse(BaseModel):
     items: List[Order]
-    total: int
+    total: Optional[int] = None  # Omitted when requested with count=none
     skip: int
     limit: int
+    next_cursor: Optional[str] = None  # Pass as ?cursor= to fetch the next page
+
+
+
+# Largest batch accepted by the bulk endpoints
+BULK_MAX_ITEMS = 1000
+
+
+class OrderBulkCreate(BaseModel):
+    orders: List[OrderCreate] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+
+class OrderBulkUpdate(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+    changes: OrderUpdate
+
+
+class OrderBulkResult(BaseModel):
+    index: int  # Position in the request
+    id: Optional[int] = None
+    external_id: Optional[str] = None
+    result: Literal["created", "updated", "exists", "duplicate", "not_found"]
+
 
+class OrderBulkResponse(BaseModel):
+    results: List[OrderBulkResult]
+    succeeded: int
+    failed: int
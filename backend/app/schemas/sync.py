@@ -6,6 +6,7 @@ from app.models.sync_log import SyncType, SyncStatus
 
 class SyncRequest(BaseModel):
     source: str  # "etsy" or "tiktok_shop"
+    full_resync: bool = False  # Ignore the stored cursor and re-import the whole history
 
 
 class SyncLog(BaseModel):
@@ -13,10 +14,14 @@ class SyncLog(BaseModel):
     sync_type: SyncType
     status: SyncStatus
     source: str
+    user_id: Optional[int] = None
     order_id: Optional[int] = None
     records_processed: int = 0
     records_successful: int = 0
     records_failed: int = 0
+    records_inserted: int = 0
+    records_updated: int = 0
+    records_unchanged: int = 0
     error_message: Optional[str] = None
     started_at: datetime
     completed_at: Optional[datetime] = None
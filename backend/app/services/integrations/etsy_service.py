@@ -1,49 +1,114 @@
+import asyncio
 import httpx
-from typing import List, Dict, Any, Optional
+import random
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 from app.core.config import settings
+from app.core.database import DbSession, run_db
+from app.core.http import get_http_client
+from app.services.integrations.rate_limiter import etsy_rate_limiter
+from app.services.integrations.token_cache import oauth_token_cache
 from sqlalchemy.orm import Session
 from app.models.oauth_token import OAuthToken
 
 
+class EtsyAuthenticationError(ValueError):
+    """Raised when Etsy rejects the access token a request was made with"""
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter"""
+    ceiling = min(settings.ETSY_RETRY_BACKOFF_MAX, settings.ETSY_RETRY_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds to wait according to a Retry-After header, if present"""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
 class EtsyService:
-    def __init__(self, db: Optional[Session] = None, user_id: Optional[int] = None):
+    def __init__(
+        self,
+        db: Optional[DbSession] = None,
+        user_id: Optional[int] = None,
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
         self.api_key = settings.ETSY_API_KEY
         self.api_secret = settings.ETSY_API_SECRET
         self.redirect_uri = settings.ETSY_REDIRECT_URI
         self.base_url = "https://openapi.etsy.com/v3"
         self.db = db
         self.user_id = user_id
+        self.http_client = http_client or get_http_client()
 
-    def get_access_token(self) -> Optional[str]:
-        """Get the current access token from database"""
+    async def get_access_token(self) -> Optional[str]:
+        """Get the current access token, from the in-process cache or the database"""
         if not self.db or not self.user_id:
             return None
         
+        # Confirmed against the stored version recently, so no round trip
+        cached = oauth_token_cache.get(self.user_id, "etsy")
+        if cached:
+            return cached.access_token
+        
         try:
-            token = self.db.query(OAuthToken).filter(
-                OAuthToken.source == "etsy",
-                OAuthToken.user_id == self.user_id
-            ).first()
-            
-            if not token:
-                return None
-            
-            # Check if token is expired
-            if token.expires_at and token.expires_at < datetime.utcnow():
-                # Token expired, try to refresh
-                if token.refresh_token:
-                    return self._refresh_token(token)
-                return None
-            
-            return token.access_token
+            return await run_db(self.db, self._load_access_token)
         except Exception as e:
             # Handle case where oauth_tokens table doesn't exist yet
             print(f"Error getting access token (table may not exist): {e}")
             return None
 
+    def _load_access_token(self, db: Session) -> Optional[str]:
+        # Cheap version probe, so a reconnect or disconnect in another process is picked up
+        stored = db.query(OAuthToken.id, OAuthToken.version).filter(
+            OAuthToken.source == "etsy",
+            OAuthToken.user_id == self.user_id
+        ).first()
+        if not stored:
+            oauth_token_cache.invalidate(self.user_id, "etsy")
+            return None
+        
+        version = (stored.id, stored.version)
+        cached = oauth_token_cache.get(self.user_id, "etsy", version)
+        if cached:
+            return cached.access_token
+        
+        token = db.get(OAuthToken, stored.id)
+        
+        # Check if token is expired
+        if token.expires_at and token.expires_at < datetime.utcnow():
+            # Token expired, try to refresh
+            if token.refresh_token:
+                return self._refresh_token(token)
+            return None
+        
+        oauth_token_cache.set(self.user_id, "etsy", token.access_token, token.expires_at, version)
+        return token.access_token
+
+    def _get_stored_token(self, db: Session) -> Optional[OAuthToken]:
+        return db.query(OAuthToken).filter(
+            OAuthToken.source == "etsy",
+            OAuthToken.user_id == self.user_id
+        ).first()
+
     def _refresh_token(self, token: OAuthToken) -> Optional[str]:
         """Refresh the access token using refresh token"""
+        # Whatever happens, the cached copy of the old token must not be reused
+        oauth_token_cache.invalidate(token.user_id, "etsy")
         # TODO: Implement token refresh
         # For now, return None if expired
         return None
@@ -53,10 +118,17 @@ class EtsyService:
         method: str, 
         endpoint: str, 
         params: Optional[Dict[str, Any]] = None,
-        data: Optional[Dict[str, Any]] = None
+        data: Optional[Dict[str, Any]] = None,
+        shop_id: Optional[int] = None,
+        access_token: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Make an authenticated request to Etsy API"""
-        access_token = self.get_access_token()
+        """Make an authenticated request to Etsy API, retrying rate limited and failed calls
+
+        Pass access_token to keep the request off the database session (e.g. from
+        tasks running alongside other work on it); otherwise it is looked up.
+        """
+        if access_token is None:
+            access_token = await self.get_access_token()
         
         if not access_token:
             raise ValueError("No valid access token. Please authenticate with Etsy first.")
@@ -67,31 +139,68 @@ class EtsyService:
         }
         
         url = f"{self.base_url}{endpoint}"
+        max_retries = settings.ETSY_MAX_RETRIES
         
-        async with httpx.AsyncClient() as client:
-            response = await client.request(
-                method=method,
-                url=url,
-                headers=headers,
-                params=params,
-                json=data,
-                timeout=30.0
-            )
+        for attempt in range(max_retries + 1):
+            await etsy_rate_limiter.acquire(self.api_key or "", shop_id)
+            
+            try:
+                response = await self.http_client.request(
+                    method=method,
+                    url=url,
+                    headers=headers,
+                    params=params,
+                    json=data
+                )
+            except httpx.TransportError:
+                if attempt >= max_retries:
+                    raise
+                await asyncio.sleep(_backoff_delay(attempt))
+                continue
+            
+            etsy_rate_limiter.record_response(self.api_key or "", response.headers)
+            
+            if response.status_code == 401 and self.user_id:
+                # Rejected token: the next lookup re-checks the database instead of the cache
+                oauth_token_cache.invalidate(self.user_id, "etsy")
+            
+            if attempt < max_retries and (response.status_code == 429 or response.status_code >= 500):
+                delay = _retry_after(response)
+                if delay is None:
+                    delay = _backoff_delay(attempt)
+                if response.status_code == 429:
+                    # Hold back every request on this key, not just this one
+                    etsy_rate_limiter.pause(self.api_key or "", delay)
+                print(f"Etsy API returned {response.status_code} for {endpoint}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            
             response.raise_for_status()
             return response.json()
 
+    def get_remaining_quota(self) -> Dict[str, Any]:
+        """Remaining Etsy API quota for this application's key"""
+        return etsy_rate_limiter.quota(self.api_key or "")
+
     async def get_shop_id(self) -> Optional[int]:
-        """Get the authenticated user's shop ID"""
+        """Get the authenticated user's shop ID (memory, then database, then Etsy API)"""
+        access_token = await self.get_access_token()
+        if self.user_id and access_token:
+            shop_id = oauth_token_cache.get_shop_id(self.user_id, "etsy", access_token)
+            if shop_id:
+                return shop_id
+        
         token = None
         # First try to get from stored token
-        if self.db:
+        if self.db and self.user_id:
             try:
-                token = self.db.query(OAuthToken).filter(
-                    OAuthToken.source == "etsy"
-                ).first()
+                token = await run_db(self.db, self._get_stored_token)
                 if token and token.shop_id:
                     try:
-                        return int(token.shop_id)
+                        shop_id = int(token.shop_id)
+                        if access_token:
+                            oauth_token_cache.set_shop_id(self.user_id, "etsy", access_token, shop_id)
+                        return shop_id
                     except (ValueError, TypeError):
                         pass
             except Exception as e:
@@ -128,13 +237,12 @@ class EtsyService:
                 # Update token with shop_id if we have a db session
                 if self.db and token:
                     try:
-                        token.shop_id = str(shop_id)
-                        if shop_name and not token.shop_name:
-                            token.shop_name = shop_name
-                        self.db.commit()
+                        await run_db(self.db, self._store_shop, token, shop_id, shop_name)
                     except Exception as e:
-                        self.db.rollback()
+                        await run_db(self.db, lambda db: db.rollback())
                         print(f"Error updating token with shop_id: {e}")
+                if self.user_id and access_token and shop_id:
+                    oauth_token_cache.set_shop_id(self.user_id, "etsy", access_token, int(shop_id))
                 return shop_id
             return None
         except httpx.HTTPStatusError as e:
@@ -153,10 +261,22 @@ class EtsyService:
                 )
             raise ValueError(f"Error getting shop ID: {error_msg}")
 
-    async def fetch_orders(self, shop_id: Optional[int] = None, min_created: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Fetch orders (receipts) from Etsy API"""
+    def _store_shop(self, db: Session, token: OAuthToken, shop_id: Any, shop_name: str):
+        token.shop_id = str(shop_id)
+        if shop_name and not token.shop_name:
+            token.shop_name = shop_name
+        db.commit()
+
+    async def fetch_orders(
+        self,
+        shop_id: Optional[int] = None,
+        min_created: Optional[int] = None,
+        min_last_modified: Optional[int] = None,
+        page_size: int = 100
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Fetch orders (receipts) from Etsy API, yielding one page at a time"""
         # Check if we have an access token first
-        access_token = self.get_access_token()
+        access_token = await self.get_access_token()
         if not access_token:
             raise ValueError(
                 "No Etsy access token found. Please authenticate first by visiting: "
@@ -172,43 +292,103 @@ class EtsyService:
                 "Visit /api/v1/auth/etsy/status to check your authentication status."
             )
         
-        all_receipts = []
-        limit = 100
-        offset = 0
+        base_params = {"limit": page_size}
+        if min_created:
+            base_params["min_created"] = min_created
+        if min_last_modified:
+            base_params["min_last_modified"] = min_last_modified
         
-        try:
+        # Page requests get the token and shop resolved above and never touch
+        # self.db, which the caller is writing earlier pages through meanwhile
+        def request_page(offset: int):
+            return self._fetch_receipts_page(shop_id, {**base_params, "offset": offset}, access_token)
+        
+        async def page_result(offset: int, used_token: str, request) -> Dict[str, Any]:
+            nonlocal access_token
+            try:
+                return await request
+            except EtsyAuthenticationError:
+                # Runs in the generator (the caller is waiting on us, so the session
+                # is free): re-check the stored token once and retry with a new one
+                if used_token == access_token:
+                    access_token = await self._renewed_access_token(used_token)
+                return await request_page(offset)
+        
+        first_page = await page_result(0, access_token, request_page(0))
+        receipts = first_page.get("results", [])
+        if not receipts:
+            return
+        
+        # Hand each page to the caller before holding more so memory stays
+        # bounded by the number of pages in flight
+        yield receipts
+        
+        if len(receipts) < page_size:
+            return
+        
+        total = first_page.get("count")
+        if total is None:
+            # No total reported - fall back to walking the pages one at a time
+            offset = page_size
             while True:
-                params = {
-                    "limit": limit,
-                    "offset": offset,
-                }
-                
-                if min_created:
-                    params["min_created"] = min_created
-                
-                response = await self._make_request(
-                    "GET",
-                    f"/application/shops/{shop_id}/receipts",
-                    params=params
-                )
-                
-                receipts = response.get("results", [])
+                page = await page_result(offset, access_token, request_page(offset))
+                receipts = page.get("results", [])
                 if not receipts:
                     break
-                
-                all_receipts.extend(receipts)
-                
-                # Check if there are more pages
-                if len(receipts) < limit:
+                yield receipts
+                if len(receipts) < page_size:
                     break
-                
-                offset += limit
-            
-            return all_receipts
+                offset += page_size
+            return
+        
+        # The remaining offsets are known, so keep a window of requests in
+        # flight and yield the pages back in order as each one completes
+        offsets = iter(range(page_size, int(total), page_size))
+        pending = deque()
         
+        def schedule_next():
+            offset = next(offsets, None)
+            if offset is not None:
+                pending.append((offset, access_token, asyncio.ensure_future(request_page(offset))))
+        
+        try:
+            for _ in range(max(1, settings.ETSY_FETCH_CONCURRENCY)):
+                schedule_next()
+            
+            while pending:
+                page = await page_result(*pending.popleft())
+                schedule_next()
+                receipts = page.get("results", [])
+                if receipts:
+                    yield receipts
+        finally:
+            # Stop outstanding requests if a page failed or the caller stopped early
+            tasks = [task for _, _, task in pending]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _renewed_access_token(self, rejected: str) -> str:
+        """The stored access token after Etsy rejected `rejected`, if it has been replaced since"""
+        # The 401 dropped the cached entry, so this reads the database
+        access_token = await self.get_access_token()
+        if not access_token or access_token == rejected:
+            raise EtsyAuthenticationError("Authentication failed. Please re-authenticate with Etsy.")
+        return access_token
+
+    async def _fetch_receipts_page(self, shop_id: int, params: Dict[str, Any], access_token: str) -> Dict[str, Any]:
+        """Fetch a single page of shop receipts"""
+        try:
+            return await self._make_request(
+                "GET",
+                f"/application/shops/{shop_id}/receipts",
+                params=params,
+                shop_id=shop_id,
+                access_token=access_token
+            )
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 401:
-                raise ValueError("Authentication failed. Please re-authenticate with Etsy.")
+                raise EtsyAuthenticationError("Authentication failed. Please re-authenticate with Etsy.")
             raise
         except Exception as e:
             raise ValueError(f"Error fetching orders from Etsy: {str(e)}")
@@ -221,6 +401,13 @@ class EtsyService:
         except Exception as e:
             raise ValueError(f"Error fetching receipt details: {str(e)}")
 
+    @staticmethod
+    def receipt_timestamps(receipt: Dict[str, Any]) -> Tuple[int, int]:
+        """Return the (created, last modified) unix timestamps of a receipt"""
+        created = receipt.get("creation_timestamp") or receipt.get("create_timestamp") or receipt.get("created_timestamp") or 0
+        updated = receipt.get("updated_timestamp") or receipt.get("update_timestamp") or created
+        return int(created), int(updated)
+
     def transform_receipt_to_order(self, receipt: Dict[str, Any]) -> Dict[str, Any]:
         """Transform Etsy receipt data to our Order model format"""
         # Extract customer information
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+from app.core.config import settings
+
+
+class RateLimitExceeded(ValueError):
+    """Raised when the quota would not free up within the allowed wait"""
+
+
+def _process_share(limit: float) -> float:
+    """This process's part of a limit split across ETSY_RATE_LIMIT_PROCESSES processes"""
+    return limit / max(1, settings.ETSY_RATE_LIMIT_PROCESSES)
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of blocking"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate  # Tokens added per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        # Plain lock - nothing awaits while holding it, so it is safe across
+        # event loops and threads
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """Take tokens (possibly going into debt) and return the seconds to wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    def refund(self, tokens: float = 1):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + tokens)
+
+    def sync(self, remaining: float):
+        """Align with the remaining quota reported by the server"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, remaining)
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for the next `seconds` (e.g. after a Retry-After)"""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, self.tokens)
+
+
+class EtsyRateLimiter:
+    """Per-API-key and per-shop request scheduler for the Etsy Open API
+
+    Buckets live in process memory, so each process only hands out its share
+    of the configured limits; together they stay within the key's quota.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[tuple, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: tuple, rate: float, capacity: float) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, capacity)
+            return bucket
+
+    def _second_bucket(self, api_key: str) -> TokenBucket:
+        rate = _process_share(settings.ETSY_RATE_LIMIT_PER_SECOND)
+        return self._bucket(("key", api_key, "second"), rate, rate)
+
+    def _day_bucket(self, api_key: str) -> TokenBucket:
+        per_day = _process_share(settings.ETSY_RATE_LIMIT_PER_DAY)
+        return self._bucket(("key", api_key, "day"), per_day / 86400, per_day)
+
+    def _shop_bucket(self, shop_id: Any) -> TokenBucket:
+        rate = _process_share(settings.ETSY_SHOP_RATE_LIMIT_PER_SECOND)
+        return self._bucket(("shop", str(shop_id), "second"), rate, rate)
+
+    async def acquire(self, api_key: str, shop_id: Optional[Any] = None):
+        """Wait until a request for this key (and shop) fits in the quotas"""
+        buckets = [self._second_bucket(api_key), self._day_bucket(api_key)]
+        if shop_id:
+            buckets.append(self._shop_bucket(shop_id))
+
+        wait = max(bucket.reserve() for bucket in buckets)
+        if wait > settings.ETSY_MAX_QUOTA_WAIT:
+            for bucket in buckets:
+                bucket.refund()
+            raise RateLimitExceeded(
+                f"Etsy API quota exhausted, next request possible in {int(wait)} seconds"
+            )
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def record_response(self, api_key: str, headers: Mapping[str, str]):
+        """Sync the buckets with the quota headers Etsy returns on every response"""
+        remaining_second = headers.get("x-remaining-this-second")
+        if remaining_second is not None:
+            try:
+                self._second_bucket(api_key).sync(float(remaining_second))
+            except ValueError:
+                pass
+        remaining_today = headers.get("x-remaining-today")
+        if remaining_today is not None:
+            try:
+                self._day_bucket(api_key).sync(float(remaining_today))
+            except ValueError:
+                pass
+
+    def pause(self, api_key: str, seconds: float):
+        """Stop all requests for this key for a while (after a 429)"""
+        self._second_bucket(api_key).pause(seconds)
+
+    def quota(self, api_key: str) -> Dict[str, Any]:
+        """Remaining quota for an API key in this process"""
+        return {
+            "processes": max(1, settings.ETSY_RATE_LIMIT_PROCESSES),
+            "per_second_limit": _process_share(settings.ETSY_RATE_LIMIT_PER_SECOND),
+            "per_second_remaining": int(self._second_bucket(api_key).remaining()),
+            "per_day_limit": _process_share(settings.ETSY_RATE_LIMIT_PER_DAY),
+            "per_day_remaining": int(self._day_bucket(api_key).remaining()),
+        }
+
+
+# Shared by every EtsyService in the process so concurrent syncs draw from one share of the quota
+etsy_rate_limiter = EtsyRateLimiter()
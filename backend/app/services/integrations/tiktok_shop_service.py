@@ -1,13 +1,15 @@
 import httpx
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from app.core.config import settings
+from app.core.http import get_http_client
 
 
 class TikTokShopService:
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
         self.api_key = settings.TIKTOK_SHOP_API_KEY
         self.api_secret = settings.TIKTOK_SHOP_API_SECRET
         self.base_url = "https://open-api.tiktokglobalshop.com"
+        self.http_client = http_client or get_http_client()
 
     async def fetch_orders(self) -> List[Dict[str, Any]]:
         """Fetch orders from TikTok Shop API"""
@@ -0,0 +1,89 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+
+# (oauth_tokens.id, oauth_tokens.version) of a stored token; changes on every reconnect
+TokenVersion = Tuple[int, int]
+
+
+class CachedToken:
+    """Access token held in memory until shortly before it expires"""
+
+    def __init__(self, access_token: str, expires_at: Optional[datetime], cached_until: float, version: TokenVersion):
+        self.access_token = access_token
+        self.expires_at = expires_at
+        self.cached_until = cached_until
+        self.version = version
+        self.checked_at = time.monotonic()  # Last time the version was confirmed against the database
+
+
+class TokenCache:
+    """Per-user, per-source cache of OAuth access tokens and shop IDs shared by every service in the process
+
+    Entries are tied to the stored token's version and served without a database
+    round trip for TOKEN_VERSION_CHECK_SECONDS after it was last confirmed, so a
+    reconnect made in any process (e.g. the OAuth callback in the API) is picked
+    up by the others within that window, or straight away after Etsy rejects the
+    old token (the caller invalidates the entry then).
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[int, str], CachedToken] = {}
+        # Shop IDs stay valid for as long as the user keeps the same access token
+        self._shop_ids: Dict[Tuple[int, str], Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, source: str, version: Optional[TokenVersion] = None) -> Optional[CachedToken]:
+        """Entry matching the stored version, or without one, an entry confirmed recently enough to skip the check"""
+        with self._lock:
+            entry = self._entries.get((user_id, source))
+            if entry is None:
+                return None
+            now = time.monotonic()
+            if entry.cached_until <= now or (version is not None and entry.version != version):
+                del self._entries[(user_id, source)]
+                return None
+            if version is not None:
+                entry.checked_at = now
+            elif now - entry.checked_at >= settings.TOKEN_VERSION_CHECK_SECONDS:
+                return None
+            return entry
+
+    def set(self, user_id: int, source: str, access_token: str, expires_at: Optional[datetime], version: TokenVersion):
+        ttl = settings.TOKEN_CACHE_TTL_SECONDS
+        if expires_at:
+            # Stop serving the token a little before it expires so a refresh can happen
+            seconds_left = (expires_at - datetime.utcnow()).total_seconds() - settings.TOKEN_EXPIRY_SKEW_SECONDS
+            ttl = min(ttl, seconds_left)
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[(user_id, source)] = CachedToken(
+                access_token=access_token,
+                expires_at=expires_at,
+                cached_until=time.monotonic() + ttl,
+                version=version,
+            )
+
+    def get_shop_id(self, user_id: int, source: str, access_token: str) -> Optional[int]:
+        with self._lock:
+            entry = self._shop_ids.get((user_id, source))
+            if entry is None or entry[0] != access_token:
+                return None
+            return entry[1]
+
+    def set_shop_id(self, user_id: int, source: str, access_token: str, shop_id: int):
+        with self._lock:
+            self._shop_ids[(user_id, source)] = (access_token, shop_id)
+
+    def invalidate(self, user_id: int, source: str):
+        with self._lock:
+            self._entries.pop((user_id, source), None)
+            self._shop_ids.pop((user_id, source), None)
+
+
+oauth_token_cache = TokenCache()
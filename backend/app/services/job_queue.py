@@ -0,0 +1,211 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import and_, exists, func, or_, text, update
+from sqlalchemy.orm import Session, aliased
+from app.core.config import settings
+from app.models.sync_job import SyncJob
+from app.models.sync_log import SyncLog, SyncType, SyncStatus
+
+# Advisory lock held while claiming on PostgreSQL
+CLAIM_LOCK_KEY = 7310001
+
+
+def enqueue_sync_job(
+    db: Session,
+    user_id: int,
+    sync_type: SyncType,
+    source: str,
+    payload: Optional[Dict[str, Any]] = None,
+    run_after: Optional[datetime] = None
+) -> SyncLog:
+    """Create a pending sync log and the job that will run it"""
+    sync_log = SyncLog(
+        sync_type=sync_type,
+        status=SyncStatus.PENDING,
+        source=source,
+        user_id=user_id
+    )
+    db.add(sync_log)
+    db.flush()
+
+    db.add(SyncJob(
+        user_id=user_id,
+        sync_log_id=sync_log.id,
+        sync_type=sync_type,
+        source=source,
+        payload=payload or {},
+        status=SyncStatus.PENDING,
+        max_attempts=settings.SYNC_JOB_MAX_ATTEMPTS,
+        run_after=run_after or datetime.utcnow()
+    ))
+    db.commit()
+    db.refresh(sync_log)
+    return sync_log
+
+
+def _claimable(now: datetime):
+    """Jobs that are due, or whose worker stopped sending heartbeats
+
+    A job waits while another one for the same user and source is running, so
+    two imports never write the same orders (and their counters) at once.
+    """
+    stale_before = now - timedelta(seconds=settings.SYNC_JOB_VISIBILITY_TIMEOUT)
+    running = aliased(SyncJob)
+    return and_(
+        SyncJob.attempts < SyncJob.max_attempts,
+        or_(
+            and_(SyncJob.status == SyncStatus.PENDING, SyncJob.run_after <= now),
+            and_(SyncJob.status == SyncStatus.IN_PROGRESS, SyncJob.heartbeat_at < stale_before),
+        ),
+        ~exists().where(
+            running.user_id == SyncJob.user_id,
+            running.source == SyncJob.source,
+            running.id != SyncJob.id,
+            running.status == SyncStatus.IN_PROGRESS,
+            running.heartbeat_at >= stale_before,
+        )
+    )
+
+
+def _saturated_sources(db: Session, now: datetime) -> Optional[List[str]]:
+    """Sources at their concurrency cap, or None when the global cap is reached"""
+    stale_before = now - timedelta(seconds=settings.SYNC_JOB_VISIBILITY_TIMEOUT)
+    running = dict(
+        db.query(SyncJob.source, func.count(SyncJob.id)).filter(
+            SyncJob.status == SyncStatus.IN_PROGRESS,
+            SyncJob.heartbeat_at >= stale_before
+        ).group_by(SyncJob.source).all()
+    )
+    if sum(running.values()) >= settings.SYNC_MAX_CONCURRENT_JOBS:
+        return None
+    return [
+        source for source, count in running.items()
+        if count >= settings.SYNC_MAX_CONCURRENT_PER_SOURCE.get(source, settings.SYNC_MAX_CONCURRENT_JOBS)
+    ]
+
+
+def claim_job(db: Session, worker_id: str) -> Optional[SyncJob]:
+    """Atomically take the next runnable job for this worker, respecting the concurrency caps"""
+    now = datetime.utcnow()
+    claim_values = {
+        SyncJob.status: SyncStatus.IN_PROGRESS,
+        SyncJob.locked_by: worker_id,
+        SyncJob.heartbeat_at: now,
+        SyncJob.attempts: SyncJob.attempts + 1,
+    }
+
+    if db.get_bind().dialect.name == "postgresql":
+        # Serialize claims across workers so the caps are counted exactly
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CLAIM_LOCK_KEY})
+        saturated = _saturated_sources(db, now)
+        if saturated is None:
+            db.rollback()
+            return None
+        
+        # Skip rows another transaction has locked (e.g. an admin edit)
+        job = db.query(SyncJob).filter(
+            _claimable(now), SyncJob.source.notin_(saturated)
+        ).order_by(
+            SyncJob.run_after, SyncJob.id
+        ).limit(1).with_for_update(skip_locked=True).first()
+        if not job:
+            db.rollback()
+            return None
+        db.query(SyncJob).filter(SyncJob.id == job.id).update(claim_values, synchronize_session=False)
+        db.commit()
+        db.refresh(job)
+        return job
+
+    # SQLite has no row locks: re-check the claim condition in the UPDATE itself.
+    # Writers are serialized, so only one worker's UPDATE can match the row.
+    # The caps are best effort here since the count is read before the write.
+    for _ in range(3):
+        saturated = _saturated_sources(db, now)
+        if saturated is None:
+            db.rollback()
+            return None
+        job_id = db.query(SyncJob.id).filter(
+            _claimable(now), SyncJob.source.notin_(saturated)
+        ).order_by(
+            SyncJob.run_after, SyncJob.id
+        ).limit(1).scalar()
+        if job_id is None:
+            db.rollback()
+            return None
+        claimed = db.execute(
+            update(SyncJob).where(SyncJob.id == job_id, _claimable(now)).values(claim_values)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return db.get(SyncJob, job_id)
+    return None
+
+
+def fail_exhausted_jobs(db: Session) -> int:
+    """Mark abandoned jobs that have used up their attempts as failed"""
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=settings.SYNC_JOB_VISIBILITY_TIMEOUT)
+    exhausted = db.query(SyncJob).filter(
+        SyncJob.status == SyncStatus.IN_PROGRESS,
+        SyncJob.heartbeat_at < stale_before,
+        SyncJob.attempts >= SyncJob.max_attempts
+    ).all()
+
+    for job in exhausted:
+        job.status = SyncStatus.FAILED
+        job.finished_at = now
+        job.last_error = job.last_error or "Worker stopped responding"
+        db.query(SyncLog).filter(
+            SyncLog.id == job.sync_log_id,
+            SyncLog.status.in_([SyncStatus.PENDING, SyncStatus.IN_PROGRESS])
+        ).update({
+            SyncLog.status: SyncStatus.FAILED,
+            SyncLog.error_message: job.last_error,
+            SyncLog.completed_at: now,
+        }, synchronize_session=False)
+    db.commit()
+    return len(exhausted)
+
+
+def heartbeat(db: Session, job_id: int, worker_id: str) -> bool:
+    """Extend this worker's claim on a job; False if the job was taken over"""
+    updated = db.query(SyncJob).filter(
+        SyncJob.id == job_id,
+        SyncJob.locked_by == worker_id,
+        SyncJob.status == SyncStatus.IN_PROGRESS
+    ).update({SyncJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+    db.commit()
+    return bool(updated)
+
+
+def complete_job(db: Session, job_id: int, worker_id: str):
+    """Mark a job as finished successfully"""
+    db.query(SyncJob).filter(
+        SyncJob.id == job_id,
+        SyncJob.locked_by == worker_id
+    ).update({
+        SyncJob.status: SyncStatus.SUCCESS,
+        SyncJob.finished_at: datetime.utcnow(),
+        SyncJob.locked_by: None,
+    }, synchronize_session=False)
+    db.commit()
+
+
+def fail_job(db: Session, job_id: int, worker_id: str, error: str):
+    """Record a failed attempt, scheduling a retry while attempts remain"""
+    job = db.query(SyncJob).filter(
+        SyncJob.id == job_id,
+        SyncJob.locked_by == worker_id
+    ).first()
+    if not job:
+        return
+
+    job.last_error = error
+    job.locked_by = None
+    if job.attempts < job.max_attempts:
+        job.status = SyncStatus.PENDING
+        job.run_after = datetime.utcnow() + timedelta(seconds=settings.SYNC_JOB_RETRY_DELAY * job.attempts)
+    else:
+        job.status = SyncStatus.FAILED
+        job.finished_at = datetime.utcnow()
+    db.commit()
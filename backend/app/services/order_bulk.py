@@ -0,0 +1,118 @@
+from typing import Any, Dict, List
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from app.core.database import dialect_insert
+from app.models.order import Order, ORDER_UPSERT_KEY, build_search_text
+from app.schemas.order import OrderCreate, OrderUpdate
+from app.services.order_stats import SNAPSHOT_FIELDS, order_snapshot, record_order_changes
+
+# Changes to these fields mean the search text has to be rebuilt
+SEARCH_FIELDS = ("customer_name", "customer_email", "items")
+
+
+def bulk_create_orders(db: Session, user_id: int, orders: List[OrderCreate]) -> List[Dict[str, Any]]:
+    """Insert a batch of orders in one statement, skipping any that already exist (caller commits)"""
+    results = []
+    rows = {}
+    for index, order in enumerate(orders):
+        order_data = order.dict()
+        order_data["user_id"] = user_id
+        key = (order_data["source"], order_data["external_id"])
+        result = {"index": index, "id": None, "external_id": order_data["external_id"], "result": "created"}
+        if key in rows:
+            # First occurrence in the request wins
+            result["result"] = "duplicate"
+        else:
+            # Core inserts skip the ORM hooks, so derive the search text here
+            order_data["search_text"] = build_search_text(
+                order_data["customer_name"],
+                order_data.get("customer_email"),
+                order_data["external_id"],
+                order_data.get("items")
+            )
+            rows[key] = order_data
+        results.append(result)
+
+    insert_stmt = dialect_insert(db, Order.__table__).values(list(rows.values()))
+    created = {
+        (row.source, row.external_id): row.id
+        for row in db.execute(
+            insert_stmt.on_conflict_do_nothing(index_elements=ORDER_UPSERT_KEY).returning(
+                Order.__table__.c.id, Order.__table__.c.source, Order.__table__.c.external_id
+            )
+        )
+    }
+    record_order_changes(
+        db, user_id,
+        added=[order_snapshot(order_data) for key, order_data in rows.items() if key in created]
+    )
+
+    for result, order in zip(results, orders):
+        if result["result"] == "duplicate":
+            continue
+        order_id = created.get((order.source, order.external_id))
+        if order_id is None:
+            result["result"] = "exists"
+        else:
+            result["id"] = order_id
+    return results
+
+
+def bulk_update_orders(db: Session, user_id: int, ids: List[int], changes: OrderUpdate) -> List[Dict[str, Any]]:
+    """Apply the same changes to a batch of orders with set-based statements (caller commits)"""
+    values = changes.dict(exclude_unset=True)
+    rebuild_search = any(field in values for field in SEARCH_FIELDS)
+
+    columns = [Order.id, Order.external_id] + [getattr(Order, field) for field in SNAPSHOT_FIELDS]
+    if rebuild_search:
+        columns += [getattr(Order, field) for field in SEARCH_FIELDS]
+    existing = {
+        row.id: row
+        # Locked (in id order, so concurrent batches can't deadlock) until commit: these
+        # rows are the "before" snapshots the counter and rollup deltas are computed from
+        for row in db.query(*columns).filter(
+            Order.user_id == user_id, Order.id.in_(set(ids))
+        ).order_by(Order.id).with_for_update()
+    }
+
+    if existing and values:
+        db.execute(
+            update(Order).where(Order.user_id == user_id, Order.id.in_(list(existing))).values(
+                **values, updated_at=func.now()
+            ).execution_options(synchronize_session=False)
+        )
+        if rebuild_search:
+            search_rows = []
+            for row in existing.values():
+                merged = {**row._asdict(), **values}
+                search_rows.append({
+                    "order_id": row.id,
+                    "search_text": build_search_text(
+                        merged["customer_name"], merged["customer_email"], row.external_id, merged["items"]
+                    ),
+                })
+            # One executemany rather than a round trip per order
+            db.execute(
+                update(Order.__table__).where(Order.__table__.c.id == bindparam("order_id")).values(
+                    search_text=bindparam("search_text")
+                ),
+                search_rows
+            )
+        record_order_changes(
+            db, user_id,
+            removed=[order_snapshot(row._asdict()) for row in existing.values()],
+            added=[order_snapshot({**row._asdict(), **values}) for row in existing.values()]
+        )
+
+    results = []
+    seen = set()
+    for index, order_id in enumerate(ids):
+        row = existing.get(order_id)
+        if row is None or order_id in seen:
+            result = "not_found" if row is None else "duplicate"
+            results.append({"index": index, "id": order_id, "external_id": None, "result": result})
+            continue
+        seen.add(order_id)
+        results.append({"index": index, "id": order_id, "external_id": row.external_id, "result": "updated"})
+    return results
@@ -0,0 +1,49 @@
+from sqlalchemy import Integer, or_, text
+from sqlalchemy.orm import Query, Session
+from app.models.order import Order
+
+# Shortest term the trigram index can serve; shorter terms match word prefixes instead
+MIN_TRIGRAM_LENGTH = 3
+
+
+def _like_escape(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _prefix_condition(term: str):
+    """Match the start of any word in the search text"""
+    escaped = _like_escape(term)
+    return or_(
+        Order.search_text.like(f"{escaped}%", escape="\\"),
+        Order.search_text.like(f"% {escaped}%", escape="\\"),
+    )
+
+
+def search_orders(db: Session, query: Query, user_id: int, search: str) -> Query:
+    """Filter an order query by a search term using the search index for the database"""
+    term = search.strip().lower()
+    if not term:
+        return query
+
+    # Receipt numbers: an exact external_id hit takes precedence over a substring scan
+    if term.isdigit():
+        exact = db.query(Order.id).filter(
+            Order.user_id == user_id, Order.external_id == term
+        ).first()
+        if exact:
+            return query.filter(Order.external_id == term)
+
+    if len(term) < MIN_TRIGRAM_LENGTH:
+        return query.filter(_prefix_condition(term))
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        # Quoted as a single FTS5 phrase so user input is never parsed as query syntax
+        phrase = '"' + term.replace('"', '""') + '"'
+        matches = text(
+            "SELECT rowid FROM orders_search WHERE orders_search MATCH :phrase"
+        ).bindparams(phrase=phrase).columns(rowid=Integer)
+        return query.filter(Order.id.in_(matches))
+
+    # PostgreSQL serves this LIKE from the pg_trgm GIN index
+    return query.filter(Order.search_text.like(f"%{_like_escape(term)}%", escape="\\"))
@@ -0,0 +1,219 @@
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import func, literal
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from app.core.database import dialect_insert
+from app.core.response_cache import bump_data_version
+from app.models.order import Order, OrderSource, OrderStatus
+from app.models.order_counter import OrderCounter
+from app.models.order_rollup import OrderMonthlyRollup
+
+# Order fields the per-user aggregates depend on
+SNAPSHOT_FIELDS = ("source", "status", "order_date", "total_amount", "currency")
+
+
+def order_snapshot(order: Any) -> Dict[str, Any]:
+    """Capture the aggregate-relevant fields of an ORM order, row or dict"""
+    if isinstance(order, dict):
+        values = {field: order.get(field) for field in SNAPSHOT_FIELDS}
+    else:
+        values = {field: getattr(order, field, None) for field in SNAPSHOT_FIELDS}
+    values["source"] = OrderSource(values["source"])
+    values["status"] = OrderStatus(values["status"] or OrderStatus.PENDING)
+    values["currency"] = values["currency"] or "USD"
+    values["total_amount"] = values["total_amount"] or 0
+    return values
+
+
+def month_start(value: datetime) -> date:
+    """First day of the UTC calendar month a timestamp falls in
+
+    Order dates are stored as naive UTC, the values rebuild_monthly_rollups groups,
+    so incremental updates and a rebuild bucket every order into the same month.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return date(value.year, value.month, 1)
+
+
+def record_order_changes(
+    db: Session,
+    user_id: int,
+    removed: Iterable[Dict[str, Any]] = (),
+    added: Iterable[Dict[str, Any]] = ()
+):
+    """Keep the per-user order aggregates in step with order writes (caller commits)
+
+    `removed` holds snapshots of orders as they were before the write (deleted or
+    updated orders) and `added` snapshots as they are after it (created or updated).
+    """
+    removed = list(removed)
+    added = list(added)
+    _update_counters(db, user_id, removed, added)
+    _update_rollups(db, user_id, removed, added)
+    bump_data_version(db, user_id)
+
+
+def _update_counters(db: Session, user_id: int, removed: List[Dict[str, Any]], added: List[Dict[str, Any]]):
+    deltas = Counter()
+    for snapshot in removed:
+        deltas[(snapshot["source"], snapshot["status"])] -= 1
+    for snapshot in added:
+        deltas[(snapshot["source"], snapshot["status"])] += 1
+
+    rows = [
+        {"user_id": user_id, "source": source, "status": status, "count": delta}
+        for (source, status), delta in deltas.items()
+        if delta
+    ]
+    if not rows:
+        return
+
+    insert_stmt = dialect_insert(db, OrderCounter.__table__).values(rows)
+    db.execute(
+        insert_stmt.on_conflict_do_update(
+            index_elements=["user_id", "source", "status"],
+            set_={"count": OrderCounter.__table__.c.count + insert_stmt.excluded.count}
+        )
+    )
+
+
+def _update_rollups(db: Session, user_id: int, removed: List[Dict[str, Any]], added: List[Dict[str, Any]]):
+    counts = Counter()
+    revenue = Counter()
+    for sign, snapshots in ((-1, removed), (1, added)):
+        for snapshot in snapshots:
+            key = (month_start(snapshot["order_date"]), snapshot["source"], snapshot["currency"])
+            counts[key] += sign
+            revenue[key] += sign * snapshot["total_amount"]
+
+    rows = [
+        {
+            "user_id": user_id,
+            "month": month,
+            "source": source,
+            "currency": currency,
+            "order_count": counts[(month, source, currency)],
+            "revenue": revenue[(month, source, currency)],
+        }
+        for month, source, currency in set(counts) | set(revenue)
+        if counts[(month, source, currency)] or revenue[(month, source, currency)]
+    ]
+    if not rows:
+        return
+
+    table = OrderMonthlyRollup.__table__
+    insert_stmt = dialect_insert(db, table).values(rows)
+    db.execute(
+        insert_stmt.on_conflict_do_update(
+            index_elements=["user_id", "month", "source", "currency"],
+            set_={
+                "order_count": table.c.order_count + insert_stmt.excluded.order_count,
+                "revenue": table.c.revenue + insert_stmt.excluded.revenue,
+            }
+        )
+    )
+
+
+def count_orders(
+    db: Session,
+    user_id: int,
+    source: Optional[OrderSource] = None,
+    status: Optional[OrderStatus] = None
+) -> int:
+    """Exact order count for a user from the counters table"""
+    query = db.query(func.coalesce(func.sum(OrderCounter.count), 0)).filter(
+        OrderCounter.user_id == user_id
+    )
+    if source:
+        query = query.filter(OrderCounter.source == source)
+    if status:
+        query = query.filter(OrderCounter.status == status)
+    return int(query.scalar())
+
+
+def rebuild_order_counters(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute the counters from the orders table (backfill and repair)"""
+    counters = db.query(OrderCounter)
+    # Orders without a status count as pending, matching order_snapshot
+    status = func.coalesce(Order.status, literal(OrderStatus.PENDING, Order.status.type))
+    orders = db.query(Order.user_id, Order.source, status, func.count(Order.id))
+    if user_id is not None:
+        counters = counters.filter(OrderCounter.user_id == user_id)
+        orders = orders.filter(Order.user_id == user_id)
+
+    counters.delete(synchronize_session=False)
+    rows = [
+        {"user_id": row_user_id, "source": source, "status": status, "count": count}
+        for row_user_id, source, status, count in orders.group_by(
+            Order.user_id, Order.source, status
+        )
+    ]
+    if rows:
+        db.bulk_insert_mappings(OrderCounter, rows)
+    db.commit()
+    return len(rows)
+
+
+def rebuild_monthly_rollups(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute the monthly rollups from the orders table (backfill and repair)"""
+    if db.get_bind().dialect.name == "postgresql":
+        month = func.date_trunc("month", Order.order_date)
+    else:
+        month = func.strftime("%Y-%m-01", Order.order_date)
+    currency = func.coalesce(Order.currency, "USD")
+
+    rollups = db.query(OrderMonthlyRollup)
+    orders = db.query(
+        Order.user_id, month, Order.source, currency,
+        func.count(Order.id), func.coalesce(func.sum(Order.total_amount), 0)
+    )
+    if user_id is not None:
+        rollups = rollups.filter(OrderMonthlyRollup.user_id == user_id)
+        orders = orders.filter(Order.user_id == user_id)
+
+    rollups.delete(synchronize_session=False)
+    rows = []
+    for row_user_id, row_month, source, row_currency, count, revenue in orders.group_by(
+        Order.user_id, month, Order.source, currency
+    ):
+        if isinstance(row_month, str):
+            row_month = date.fromisoformat(row_month)
+        elif isinstance(row_month, datetime):
+            row_month = row_month.date()
+        rows.append({
+            "user_id": row_user_id,
+            "month": row_month,
+            "source": source,
+            "currency": row_currency,
+            "order_count": count,
+            "revenue": revenue,
+        })
+    if rows:
+        db.bulk_insert_mappings(OrderMonthlyRollup, rows)
+    db.commit()
+    return len(rows)
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN wrapper so the planner's row estimate can be read for any query"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def estimate_count(db: Session, query: Query) -> int:
+    """Planner row estimate for a query on PostgreSQL, exact count elsewhere"""
+    if db.get_bind().dialect.name != "postgresql":
+        return query.count()
+    plan = db.execute(_Explain(query.statement)).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
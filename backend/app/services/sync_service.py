@@ -1,106 +1,173 @@
+import httpx
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from sqlalchemy import literal_column
 from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from app.core.config import settings
+from app.core.database import DbSession, dialect_insert, run_db
+from app.core.response_cache import bump_data_version
 from app.models.sync_log import SyncLog, SyncStatus
-from app.models.order import Order, OrderSource
+from app.models.sync_cursor import SyncCursor
+from app.models.order import Order, OrderSource, OrderStatus, ORDER_UPSERT_KEY, build_search_text
 from app.services.integrations.etsy_service import EtsyService
 from app.services.integrations.tiktok_shop_service import TikTokShopService
+from app.services.order_stats import order_snapshot, record_order_changes
+
+# Counters reported on the sync log for each import
+SYNC_STAT_KEYS = (
+    "records_processed",
+    "records_successful",
+    "records_failed",
+    "records_inserted",
+    "records_updated",
+    "records_unchanged",
+)
+
+# Order columns refreshed from the marketplace on every import
+UPSERT_COLUMNS = (
+    "status",
+    "customer_name",
+    "customer_email",
+    "shipping_address",
+    "total_amount",
+    "currency",
+    "items",
+    "order_date",
+)
+
+
+def _to_timestamp(value: datetime) -> int:
+    """Convert a naive UTC datetime to a unix timestamp"""
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _from_timestamp(value: int) -> datetime:
+    """Convert a unix timestamp to a naive UTC datetime"""
+    return datetime.fromtimestamp(value, tz=timezone.utc).replace(tzinfo=None)
 
 
 class SyncService:
-    def __init__(self, db: Session, user_id: int):
+    def __init__(self, db: DbSession, user_id: int, http_client: Optional[httpx.AsyncClient] = None):
         self.db = db
         self.user_id = user_id
-        self.etsy_service = EtsyService(db=db, user_id=user_id)
-        self.tiktok_shop_service = TikTokShopService()
+        self.etsy_service = EtsyService(db=db, user_id=user_id, http_client=http_client)
+        self.tiktok_shop_service = TikTokShopService(http_client=http_client)
 
-    async def import_orders(self, sync_log_id: int, source: str):
-        """Import orders from the specified source"""
-        from datetime import datetime
+    async def import_orders(self, sync_log_id: int, source: str, full_resync: bool = False):
+        """Import orders from the specified source, starting from the stored cursor unless full_resync"""
         
-        # Start with a fresh query to get the sync_log
-        sync_log = self.db.query(SyncLog).filter(SyncLog.id == sync_log_id).first()
-        if not sync_log:
-            return
-
-        # Update status to IN_PROGRESS
-        sync_log.status = SyncStatus.IN_PROGRESS
-        try:
-            self.db.commit()
-        except Exception:
-            self.db.rollback()
+        if not await run_db(self.db, self._start_sync_log, sync_log_id):
             return
 
         # Track stats outside of the sync_log object to avoid transaction issues
-        records_processed = 0
-        records_successful = 0
-        records_failed = 0
+        stats = {key: 0 for key in SYNC_STAT_KEYS}
         error_message = None
 
         try:
             if source == "etsy":
-                receipts = await self.etsy_service.fetch_orders()
+                cursor = None if full_resync else await run_db(self.db, self._get_cursor, source)
+                min_last_modified = None
+                if cursor and cursor.last_updated_at:
+                    min_last_modified = (
+                        _to_timestamp(cursor.last_updated_at) - settings.SYNC_CURSOR_OVERLAP_SECONDS
+                    )
+                
+                # Newest timestamps among committed pages, persisted only once every page is written
+                max_created = 0
+                max_updated = 0
                 
-                # Transform and save orders
-                for receipt in receipts:
-                    try:
-                        # Transform Etsy receipt to our order format
-                        order_data = self.etsy_service.transform_receipt_to_order(receipt)
-                        
-                        # Add user_id to order_data
-                        order_data["user_id"] = self.user_id
-                        
-                        # Check if order already exists (user-specific)
-                        existing_order = self.db.query(Order).filter(
-                            Order.external_id == order_data["external_id"],
-                            Order.source == OrderSource.ETSY,
-                            Order.user_id == self.user_id
-                        ).first()
-                        
-                        if existing_order:
-                            # Update existing order
-                            for key, value in order_data.items():
-                                if key not in ["external_id", "source", "user_id"]:
-                                    setattr(existing_order, key, value)
-                            records_successful += 1
-                        else:
-                            # Create new order
-                            new_order = Order(**order_data)
-                            self.db.add(new_order)
-                            records_successful += 1
-                        
-                        records_processed += 1
+                async for receipts in self.etsy_service.fetch_orders(
+                    min_last_modified=min_last_modified,
+                    page_size=settings.SYNC_BATCH_SIZE
+                ):
+                    page_stats = await run_db(self.db, self._write_etsy_page, sync_log_id, receipts, stats)
+                    for key in SYNC_STAT_KEYS:
+                        stats[key] += page_stats[key]
+                    if page_stats["records_failed"]:
+                        continue
                     
-                    except Exception as e:
-                        records_failed += 1
-                        records_processed += 1
-                        print(f"Error processing order {receipt.get('receipt_id')}: {e}")
+                    for receipt in receipts:
+                        created, updated = self.etsy_service.receipt_timestamps(receipt)
+                        max_created = max(max_created, created)
+                        max_updated = max(max_updated, updated)
                 
-                # Commit all the orders
-                self.db.commit()
+                if stats["records_failed"]:
+                    # Keep the cursor where it was so the retry fetches the missing orders again
+                    error_message = (
+                        f"{stats['records_failed']} of {stats['records_processed']} orders failed to import; "
+                        "sync cursor not advanced"
+                    )
+                else:
+                    await run_db(self.db, self._advance_cursor, source, max_created, max_updated)
                 
             elif source == "tiktok_shop":
                 orders = await self.tiktok_shop_service.fetch_orders()
                 # TODO: Implement TikTok Shop order processing
-                records_processed = len(orders)
-                records_successful = len(orders)
+                stats["records_processed"] = len(orders)
+                stats["records_successful"] = len(orders)
             else:
                 raise ValueError(f"Unknown source: {source}")
 
         except Exception as e:
             # Rollback any failed transaction
-            self.db.rollback()
+            await run_db(self.db, lambda db: db.rollback())
             error_message = str(e)
             # If we haven't processed anything, mark as failed
-            if records_processed == 0:
-                records_failed = 1
+            if stats["records_processed"] == 0:
+                stats["records_failed"] = 1
+
+        await run_db(self.db, self._finish_sync_log, sync_log_id, stats, error_message)
+
+    def _start_sync_log(self, db: Session, sync_log_id: int) -> bool:
+        """Mark the sync log as in progress; False if it is missing or cannot be updated"""
+        # Start with a fresh query to get the sync_log
+        sync_log = db.query(SyncLog).filter(SyncLog.id == sync_log_id).first()
+        if not sync_log:
+            return False
+
+        # Update status to IN_PROGRESS
+        sync_log.status = SyncStatus.IN_PROGRESS
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+            return False
+        return True
+
+    def _write_etsy_page(
+        self, db: Session, sync_log_id: int, receipts: List[Dict[str, Any]], stats: Dict[str, int]
+    ) -> Dict[str, int]:
+        """Upsert one page of receipts and record progress on the sync log in the same commit"""
+        try:
+            page_stats = self._import_etsy_page(db, receipts)
+            
+            # Record progress alongside the page so a failure later in the
+            # run keeps everything committed so far
+            db.query(SyncLog).filter(SyncLog.id == sync_log_id).update({
+                getattr(SyncLog, key): stats[key] + page_stats[key]
+                for key in SYNC_STAT_KEYS
+            })
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Error writing page of {len(receipts)} orders: {e}")
+            page_stats = {key: 0 for key in SYNC_STAT_KEYS}
+            page_stats["records_processed"] = len(receipts)
+            page_stats["records_failed"] = len(receipts)
+        
+        # Drop anything still held by the session so memory stays bounded by one page
+        db.expunge_all()
+        return page_stats
 
-        # Update sync_log in a fresh transaction
+    def _finish_sync_log(self, db: Session, sync_log_id: int, stats: Dict[str, int], error_message: Optional[str]):
+        """Write the final stats and status to the sync log in a fresh transaction"""
         try:
             # Re-query to get a fresh object
-            sync_log = self.db.query(SyncLog).filter(SyncLog.id == sync_log_id).first()
+            sync_log = db.query(SyncLog).filter(SyncLog.id == sync_log_id).first()
             if sync_log:
-                sync_log.records_processed = records_processed
-                sync_log.records_successful = records_successful
-                sync_log.records_failed = records_failed
+                for key, value in stats.items():
+                    setattr(sync_log, key, value)
                 sync_log.completed_at = datetime.utcnow()
                 
                 if error_message:
@@ -109,29 +176,181 @@ class SyncService:
                 else:
                     sync_log.status = SyncStatus.SUCCESS
                 
-                self.db.commit()
+                # Cached dashboard stats for this user are stale now
+                bump_data_version(db, self.user_id)
+                db.commit()
         except Exception as e:
             # Last resort - rollback and try one more time
-            self.db.rollback()
+            db.rollback()
             try:
-                sync_log = self.db.query(SyncLog).filter(SyncLog.id == sync_log_id).first()
+                sync_log = db.query(SyncLog).filter(SyncLog.id == sync_log_id).first()
                 if sync_log:
                     sync_log.status = SyncStatus.FAILED
                     sync_log.error_message = error_message or str(e)
                     sync_log.completed_at = datetime.utcnow()
-                    self.db.commit()
+                    db.commit()
             except Exception:
                 # If we can't even update the sync_log, just rollback
-                self.db.rollback()
+                db.rollback()
+
+    def _get_cursor(self, db: Session, source: str) -> Optional[SyncCursor]:
+        """Get the stored import cursor for this user and source"""
+        return db.query(SyncCursor).filter(
+            SyncCursor.user_id == self.user_id,
+            SyncCursor.source == source
+        ).first()
+
+    def _advance_cursor(self, db: Session, source: str, max_created: int, max_updated: int):
+        """Move the import cursor forward to the newest timestamps seen"""
+        if not max_created and not max_updated:
+            return
+        
+        cursor = self._get_cursor(db, source)
+        if not cursor:
+            cursor = SyncCursor(user_id=self.user_id, source=source)
+            db.add(cursor)
+        
+        if max_created:
+            created_at = _from_timestamp(max_created)
+            if not cursor.last_created_at or created_at > cursor.last_created_at:
+                cursor.last_created_at = created_at
+        if max_updated:
+            updated_at = _from_timestamp(max_updated)
+            if not cursor.last_updated_at or updated_at > cursor.last_updated_at:
+                cursor.last_updated_at = updated_at
+        
+        db.commit()
+
+    def _import_etsy_page(self, db: Session, receipts: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Upsert one page of Etsy receipts in a single statement (caller commits)"""
+        stats = {key: 0 for key in SYNC_STAT_KEYS}
+        rows = {}
+        
+        for receipt in receipts:
+            stats["records_processed"] += 1
+            try:
+                # Transform Etsy receipt to our order format
+                order_data = self.etsy_service.transform_receipt_to_order(receipt)
+                order_data["user_id"] = self.user_id
+                order_data["source"] = OrderSource(order_data["source"])
+                order_data["status"] = OrderStatus(order_data["status"])
+                # Stored as naive UTC, matching what we read back for comparison
+                order_data["order_date"] = order_data["order_date"].astimezone(timezone.utc).replace(tzinfo=None)
+                
+                if order_data["external_id"] in rows:
+                    # Duplicate receipt within the page - the later copy wins
+                    stats["records_unchanged"] += 1
+                rows[order_data["external_id"]] = order_data
+            
+            except Exception as e:
+                stats["records_failed"] += 1
+                print(f"Error processing order {receipt.get('receipt_id')}: {e}")
+        
+        if not rows:
+            return stats
+        
+        pending = rows
+        while pending:
+            existing = self._locked_existing_orders(db, list(pending.keys()))
+            
+            changed = []
+            for external_id, order_data in pending.items():
+                current = existing.get(external_id)
+                if current is not None and all(
+                    getattr(current, column) == order_data[column] for column in UPSERT_COLUMNS
+                ):
+                    stats["records_unchanged"] += 1
+                    continue
+                changed.append(order_data)
+            if not changed:
+                break
+            
+            # Core inserts skip the ORM hooks, so derive the search text here
+            for order_data in changed:
+                order_data["search_text"] = build_search_text(
+                    order_data["customer_name"],
+                    order_data.get("customer_email"),
+                    order_data["external_id"],
+                    order_data.get("items")
+                )
+            written = self._upsert_orders(db, changed, [row.id for row in existing.values()])
+            
+            removed = []
+            for external_id, inserted in written.items():
+                if inserted:
+                    stats["records_inserted"] += 1
+                else:
+                    stats["records_updated"] += 1
+                    removed.append(order_snapshot({**existing[external_id]._asdict(), "source": OrderSource.ETSY}))
+            record_order_changes(
+                db, self.user_id,
+                removed=removed,
+                added=[order_snapshot(order_data) for order_data in changed if order_data["external_id"] in written]
+            )
+            
+            # Orders a concurrent import inserted after the read above were left alone;
+            # they exist now, so another pass reads and locks them like any other update
+            pending = {
+                order_data["external_id"]: order_data
+                for order_data in changed
+                if order_data["external_id"] not in written
+            }
+        
+        stats["records_successful"] = (
+            stats["records_inserted"] + stats["records_updated"] + stats["records_unchanged"]
+        )
+        return stats
+
+    def _locked_existing_orders(self, db: Session, external_ids: List[str]) -> Dict[str, Any]:
+        """Stored orders among a page, locked until commit so the counter deltas taken from them stay right"""
+        return {
+            row.external_id: row
+            for row in db.query(
+                Order.id, Order.external_id, *[getattr(Order, column) for column in UPSERT_COLUMNS]
+            ).filter(
+                Order.user_id == self.user_id,
+                Order.source == OrderSource.ETSY,
+                Order.external_id.in_(external_ids)
+            ).order_by(Order.id).with_for_update()
+        }
+
+    def _upsert_orders(self, db: Session, rows: List[Dict[str, Any]], existing_ids: List[int]) -> Dict[str, bool]:
+        """Insert or update orders in one statement; external_id -> whether it was inserted
+
+        Only the orders in existing_ids are updated on conflict, so a row another
+        import inserted meanwhile is skipped (and left out of the result) instead
+        of being overwritten without a "before" snapshot for its counter deltas.
+        """
+        table = Order.__table__
+        insert_stmt = dialect_insert(db, table).values(rows)
+        update_values = {column: insert_stmt.excluded[column] for column in UPSERT_COLUMNS}
+        update_values["search_text"] = insert_stmt.excluded.search_text
+        update_values["updated_at"] = func.now()
+        upsert = insert_stmt.on_conflict_do_update(
+            index_elements=ORDER_UPSERT_KEY,
+            set_=update_values,
+            where=table.c.id.in_(existing_ids)
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            # xmax is 0 only on a freshly inserted row version
+            result = db.execute(upsert.returning(table.c.external_id, literal_column("xmax = 0")))
+            return {external_id: inserted for external_id, inserted in result}
+        # SQLite serializes writers, and a write on a snapshot older than another
+        # import's commit fails, so the locked read is still accurate there
+        result = db.execute(upsert.returning(table.c.id, table.c.external_id))
+        return {external_id: order_id not in existing_ids for order_id, external_id in result}
 
     async def export_products(self, sync_log_id: int, source: str):
         """Export products to the specified source"""
-        sync_log = self.db.query(SyncLog).filter(SyncLog.id == sync_log_id).first()
+        await run_db(self.db, self._export_products, sync_log_id, source)
+
+    def _export_products(self, db: Session, sync_log_id: int, source: str):
+        sync_log = db.query(SyncLog).filter(SyncLog.id == sync_log_id).first()
         if not sync_log:
             return
 
         sync_log.status = SyncStatus.IN_PROGRESS
-        self.db.commit()
+        db.commit()
 
         try:
             # TODO: Fetch products from database and export them
@@ -145,7 +364,5 @@ class SyncService:
             sync_log.error_message = str(e)
 
         finally:
-            from datetime import datetime
             sync_log.completed_at = datetime.utcnow()
-            self.db.commit()
-
+            db.commit()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Sync job worker
+
+Claims queued sync jobs from the database and runs them outside the web
+process. Run as many worker processes as the sync load needs:
+
+    python -m app.worker --concurrency 4
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+from typing import Optional
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import SessionLocal, close_session, dispose_async_engine, engine, new_session, run_db
+from app.core.http import close_http_client
+from app.core.sqlite import SqliteOptimizer
+from app.models.sync_job import SyncJob
+from app.models.sync_log import SyncLog, SyncType, SyncStatus
+from app.services import job_queue
+from app.services.sync_service import SyncService
+
+logger = logging.getLogger("app.worker")
+
+
+def _heartbeat(job_id: int, worker_id: str) -> bool:
+    """Extend the claim on a job in a short-lived session; False once it was taken over"""
+    db = SessionLocal()
+    try:
+        return job_queue.heartbeat(db, job_id, worker_id)
+    except Exception as e:
+        db.rollback()
+        logger.warning("Heartbeat failed for sync job %s: %s", job_id, e)
+        return True
+    finally:
+        db.close()
+
+
+async def _heartbeat_loop(job_id: int, worker_id: str, job_task: asyncio.Task):
+    """Keep the claim on a job alive while it runs, stopping the job if the claim is lost"""
+    while True:
+        await asyncio.sleep(settings.SYNC_JOB_HEARTBEAT_SECONDS)
+        # Off the event loop so a slow or locked database doesn't stall the other jobs
+        if not await run_in_threadpool(_heartbeat, job_id, worker_id):
+            logger.warning("Lost claim on sync job %s, cancelling it", job_id)
+            job_task.cancel()
+            return
+
+
+async def run_job(job_id: int, worker_id: str):
+    """Run one claimed job in its own database session"""
+    db = new_session()
+    heartbeat_task = asyncio.ensure_future(_heartbeat_loop(job_id, worker_id, asyncio.current_task()))
+    try:
+        job = await run_db(db, lambda db: db.get(SyncJob, job_id))
+        sync_log_id = job.sync_log_id
+        payload = job.payload or {}
+        sync_service = SyncService(db, user_id=job.user_id)
+        logger.info("Running sync job %s (%s %s, attempt %s)", job_id, job.sync_type.value, job.source, job.attempts)
+
+        if job.sync_type == SyncType.ORDER_IMPORT:
+            await sync_service.import_orders(sync_log_id, job.source, payload.get("full_resync", False))
+        elif job.sync_type == SyncType.PRODUCT_EXPORT:
+            await sync_service.export_products(sync_log_id, job.source)
+        else:
+            raise ValueError(f"Unsupported sync type: {job.sync_type}")
+
+        await run_db(db, _finish_job, job_id, worker_id, sync_log_id)
+    except asyncio.CancelledError:
+        # Another worker reclaimed the job and runs it now; leave its state to that worker
+        logger.warning("Sync job %s stopped", job_id)
+        raise
+    except Exception as e:
+        logger.exception("Sync job %s failed", job_id)
+        await run_db(db, _fail_job, job_id, worker_id, str(e))
+    finally:
+        heartbeat_task.cancel()
+        await close_session(db)
+
+
+def _finish_job(db: Session, job_id: int, worker_id: str, sync_log_id: int):
+    """Complete the job, or fail it if the sync recorded a failure"""
+    db.rollback()
+    sync_log = db.query(SyncLog).filter(SyncLog.id == sync_log_id).first()
+    if sync_log and sync_log.status == SyncStatus.FAILED:
+        job_queue.fail_job(db, job_id, worker_id, sync_log.error_message or "Sync failed")
+    else:
+        job_queue.complete_job(db, job_id, worker_id)
+
+
+def _fail_job(db: Session, job_id: int, worker_id: str, error: str):
+    db.rollback()
+    try:
+        job_queue.fail_job(db, job_id, worker_id, error)
+    except Exception:
+        db.rollback()
+
+
+def _claim_job(worker_id: str) -> Optional[int]:
+    """Claim the next runnable job in a short-lived session"""
+    db = SessionLocal()
+    try:
+        job_queue.fail_exhausted_jobs(db)
+        claimed = job_queue.claim_job(db, worker_id)
+        return claimed.id if claimed else None
+    except Exception as e:
+        db.rollback()
+        logger.warning("Could not claim a sync job: %s", e)
+        return None
+    finally:
+        db.close()
+
+
+async def run_worker(concurrency: int, poll_interval: float):
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError:
+            pass
+
+    logger.info("Sync worker %s started with concurrency %s", worker_id, concurrency)
+    running = set()
+    # SQLite installs without the scheduler still get their planner statistics refreshed
+    sqlite_optimizer = SqliteOptimizer(engine)
+    try:
+        while not stopping.is_set():
+            if sqlite_optimizer.due():
+                await run_in_threadpool(sqlite_optimizer.run)
+            claimed = None
+            if len(running) < concurrency:
+                claimed = await run_in_threadpool(_claim_job, worker_id)
+
+            if claimed is not None:
+                running.add(asyncio.ensure_future(run_job(claimed, worker_id)))
+                continue
+
+            # Nothing to claim (or no free slot) - wait for a job to finish or the next poll
+            waiters = running | {asyncio.ensure_future(stopping.wait())}
+            done, pending = await asyncio.wait(
+                waiters, timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED
+            )
+            running -= done
+            for task in pending - running:
+                task.cancel()
+    finally:
+        # Let in-flight jobs finish; anything killed mid-way is reclaimed after the visibility timeout
+        if running:
+            logger.info("Waiting for %s running sync jobs", len(running))
+            await asyncio.gather(*running, return_exceptions=True)
+        await close_http_client()
+        await dispose_async_engine()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run queued sync jobs")
+    parser.add_argument("--concurrency", type=int, default=settings.SYNC_WORKER_CONCURRENCY)
+    parser.add_argument("--poll-interval", type=float, default=settings.SYNC_WORKER_POLL_INTERVAL)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    asyncio.run(run_worker(args.concurrency, args.poll_interval))
+
+
+if __name__ == "__main__":
+    main()
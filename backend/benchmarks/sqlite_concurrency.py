@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+SQLite concurrency benchmark
+
+Runs dashboard-style readers (newest orders page) alongside sync-style writers
+(pages of order inserts) against a fresh SQLite file, once with the plain
+engine and once with the SQLite profile from app.core.sqlite:
+
+    python benchmarks/sqlite_concurrency.py --readers 8 --writers 2 --seconds 10
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.database import Base
+from app.core.sqlite import apply_sqlite_profile
+import app.models  # noqa: F401 - registers every table on Base.metadata
+from app.models.order import Order, OrderSource, OrderStatus, build_search_text
+from app.models.user import User
+
+PAGE_SIZE = 50
+
+
+def _order_rows(user_id: int, start: int, count: int) -> list:
+    now = datetime.utcnow()
+    rows = []
+    for i in range(start, start + count):
+        items = [{"title": f"Mug {i}", "quantity": 1}]
+        rows.append({
+            "user_id": user_id,
+            "external_id": str(i),
+            "source": OrderSource.ETSY,
+            "status": OrderStatus.PENDING,
+            "customer_name": f"Buyer {i}",
+            "customer_email": f"buyer{i}@example.com",
+            "total_amount": 10 + i % 90,
+            "currency": "USD",
+            "items": items,
+            "search_text": build_search_text(f"Buyer {i}", f"buyer{i}@example.com", str(i), items),
+            "order_date": now - timedelta(minutes=i),
+        })
+    return rows
+
+
+def _engine(path: str, tuned: bool):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    if tuned:
+        apply_sqlite_profile(engine)
+    return engine
+
+
+def _setup(path: str, tuned: bool, seed_rows: int) -> int:
+    engine = _engine(path, tuned)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    user = User(supertokens_user_id="bench", email="bench@example.com", name="bench")
+    db.add(user)
+    db.commit()
+    db.execute(Order.__table__.insert(), _order_rows(user.id, 0, seed_rows))
+    db.commit()
+    user_id = user.id
+    db.close()
+    engine.dispose()
+    return user_id
+
+
+def _reader(path: str, tuned: bool, user_id: int, seconds: float, results: multiprocessing.Queue):
+    """Newest-orders page, as the dashboard requests it"""
+    db = sessionmaker(bind=_engine(path, tuned), autoflush=False)()
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            db.query(Order).filter(Order.user_id == user_id).order_by(
+                Order.order_date.desc(), Order.id.desc()
+            ).limit(PAGE_SIZE).all()
+            db.rollback()
+        except Exception:
+            db.rollback()
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+    db.close()
+    results.put(("reader", latencies, errors))
+
+
+def _writer(path: str, tuned: bool, user_id: int, seconds: float, first_id: int, batch: int, results: multiprocessing.Queue):
+    """Pages of order inserts, one transaction each, as a sync import writes them"""
+    db = sessionmaker(bind=_engine(path, tuned), autoflush=False)()
+    written = 0
+    errors = 0
+    next_id = first_id
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            db.execute(Order.__table__.insert(), _order_rows(user_id, next_id, batch))
+            db.commit()
+        except Exception:
+            db.rollback()
+            errors += 1
+            continue
+        finally:
+            next_id += batch
+        written += batch
+    db.close()
+    results.put(("writer", written, errors))
+
+
+def _percentile(samples: list, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0.0
+
+
+def run(tuned: bool, readers: int, writers: int, seconds: float, seed_rows: int, batch: int) -> dict:
+    """One timed run in separate processes, like the API and sync workers share a database"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        user_id = _setup(path, tuned, seed_rows)
+        queue = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=_reader, args=(path, tuned, user_id, seconds, queue))
+            for _ in range(readers)
+        ]
+        processes += [
+            # Each writer gets its own external_id range so inserts never collide
+            multiprocessing.Process(target=_writer, args=(path, tuned, user_id, seconds, seed_rows + (n + 1) * 10_000_000, batch, queue))
+            for n in range(writers)
+        ]
+        for process in processes:
+            process.start()
+        outcomes = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    read_latencies = []
+    results = {"reads": 0, "rows_written": 0, "read_errors": 0, "write_errors": 0}
+    for role, value, errors in outcomes:
+        if role == "reader":
+            read_latencies.extend(value)
+            results["reads"] += len(value)
+            results["read_errors"] += errors
+        else:
+            results["rows_written"] += value
+            results["write_errors"] += errors
+
+    results["reads_per_second"] = round(results["reads"] / seconds, 1)
+    results["rows_written_per_second"] = round(results["rows_written"] / seconds, 1)
+    results["read_p50_ms"] = round(1000 * _percentile(read_latencies, 0.5), 2)
+    results["read_p99_ms"] = round(1000 * _percentile(read_latencies, 0.99), 2)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent read/write throughput on SQLite, before and after the profile")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--seed-rows", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=100, help="Orders inserted per write transaction")
+    args = parser.parse_args()
+
+    columns = ("reads_per_second", "read_p50_ms", "read_p99_ms", "rows_written_per_second", "read_errors", "write_errors")
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s, {args.seed_rows} seeded orders, {args.batch} orders per write")
+    print(f"{'profile':<10}" + "".join(f"{column:>{len(column) + 2}}" for column in columns))
+    for name, tuned in (("default", False), ("tuned", True)):
+        results = run(tuned, args.readers, args.writers, args.seconds, args.seed_rows, args.batch)
+        print(f"{name:<10}" + "".join(f"{results[column]:>{len(column) + 2}}" for column in columns))
+
+
+if __name__ == "__main__":
+    main()
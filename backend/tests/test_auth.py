@@ -0,0 +1,92 @@
+import asyncio
+from urllib.parse import parse_qs, urlparse
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.auth import get_session
+from app.core.config import settings
+from app.core.database import Base, get_request_db
+from app.core.http import get_http_client
+from app.main import app
+from app.models.oauth_state import OAuthState
+from app.models.user import User
+from app.services.integrations import etsy_service
+from app.services.integrations.token_cache import TokenCache
+
+
+class _Session:
+    def get_user_id(self) -> str:
+        return "st-user"
+
+
+async def etsy(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/v3/public/oauth/token":
+        return httpx.Response(200, json={"access_token": "etsy-token", "refresh_token": "refresh", "expires_in": 3600})
+    if request.url.path == "/v3/application/users/me":
+        return httpx.Response(200, json={"user_id": 7})
+    if request.url.path == "/v3/application/users/7/shops":
+        return httpx.Response(200, json={"shop_id": 42, "shop_name": "Mugs"})
+    return httpx.Response(404)
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ETSY_API_KEY", "key")
+    monkeypatch.setattr(settings, "ETSY_API_SECRET", "secret")
+    monkeypatch.setattr(etsy_service, "oauth_token_cache", TokenCache())
+    path = tmp_path / "auth.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(User(supertokens_user_id="st-user", email="user@example.com", name="user@example.com"))
+    db.commit()
+    db.close()
+    try:
+        yield path, engine
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+
+def test_etsy_connect_and_profile_on_an_async_session(database):
+    """The auth handlers do their database work through run_db, so they run on an AsyncSession"""
+    path, engine = database
+
+    async def scenario():
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+        etsy_client = httpx.AsyncClient(transport=httpx.MockTransport(etsy))
+
+        async def request_db():
+            async with AsyncSession() as db:
+                yield db
+
+        app.dependency_overrides[get_request_db] = request_db
+        app.dependency_overrides[get_session] = lambda: _Session()
+        app.dependency_overrides[get_http_client] = lambda: etsy_client
+        try:
+            async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                authorize = await client.get("/api/v1/auth/etsy/authorize")
+                assert authorize.status_code == 200
+                state = parse_qs(urlparse(authorize.json()["authorization_url"]).query)["state"][0]
+
+                callback = await client.get("/api/v1/auth/etsy/callback", params={"code": "code", "state": state})
+                assert callback.status_code == 200, callback.text
+
+                status = (await client.get("/api/v1/auth/etsy/status")).json()
+                assert (status["authenticated"], status["shop_id"], status["shop_name"]) == (True, "42", "Mugs")
+
+                profile = await client.put("/api/v1/auth/user/profile", json={"name": " Morgan "})
+                assert profile.json()["name"] == "Morgan"
+                assert (await client.get("/api/v1/auth/user/sync")).json()["name"] == "Morgan"
+        finally:
+            await etsy_client.aclose()
+            await async_engine.dispose()
+
+    asyncio.run(scenario())
+
+    db = sessionmaker(bind=engine)()
+    assert db.query(OAuthState).count() == 0
+    db.close()
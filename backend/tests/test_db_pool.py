@@ -0,0 +1,45 @@
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine, exc, text
+from app.core.database import _pool_options
+from app.core.db_pool import TimedAsyncAdaptedQueuePool, TimedQueuePool, get_db_pool_stats, instrument_engine
+
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:", "sqlite:///file:db?mode=memory&uri=true"])
+def test_in_memory_sqlite_keeps_default_pool(url):
+    assert _pool_options(url) == {}
+
+
+@pytest.mark.parametrize("url", ["sqlite:///./order_tracker.db", "postgresql://user@localhost/orders"])
+def test_file_and_server_databases_use_timed_pool(url):
+    assert _pool_options(url)["poolclass"] is TimedQueuePool
+    assert _pool_options(url, is_async=True)["poolclass"] is TimedAsyncAdaptedQueuePool
+
+
+def test_checkout_waits_and_timeouts_are_recorded(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        connect_args={"check_same_thread": False},
+        poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.2,
+    )
+    instrument_engine("test-pool", engine)
+    held = engine.connect()
+    held.execute(text("SELECT 1"))
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    release = threading.Timer(0.1, held.close)
+    release.start()
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    release.join()
+
+    stats = get_db_pool_stats()["test-pool"]
+    assert stats["pool_class"] == "TimedQueuePool"
+    assert stats["checkout_timeouts"] == 1
+    assert stats["checkouts"] == 2
+    assert stats["wait_ms"]["max"] >= 150
+    assert stats["in_use"] == 0
+    engine.dispose()
@@ -0,0 +1,189 @@
+import asyncio
+import httpx
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.core.database import Base
+from app.models.oauth_token import OAuthToken
+from app.models.order import Order
+from app.models.order_counter import OrderCounter
+from app.models.order_rollup import OrderMonthlyRollup
+from app.models.sync_log import SyncLog, SyncStatus, SyncType
+from app.models.user import User
+from app.services.integrations import etsy_service
+from app.services.integrations.etsy_service import EtsyService
+from app.services.integrations.rate_limiter import EtsyRateLimiter
+from app.services.integrations.token_cache import TokenCache
+from app.services.sync_service import SyncService
+
+RECEIPTS = 2000
+SHOP_ID = 42
+
+
+def _receipt(n: int) -> dict:
+    return {
+        "receipt_id": n,
+        "name": f"Buyer {n}",
+        "buyer_email": f"buyer{n}@example.com",
+        "total_price": {"amount": 1000 + n, "currency_code": "USD"},
+        "is_paid": True,
+        "creation_timestamp": 1700000000 + n,
+        "updated_timestamp": 1700000000 + n,
+        "transactions": [{"transaction_id": n, "title": f"Mug {n}", "price": {"amount": 1000}}],
+    }
+
+
+class StubEtsy:
+    """Receipts endpoint of one shop; `rejected` tokens get a 401 past the first pages"""
+
+    def __init__(self):
+        self.receipts = [_receipt(n) for n in range(RECEIPTS)]
+        self.requests = []
+        self.rejected = set()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        assert request.url.path == f"/v3/application/shops/{SHOP_ID}/receipts"
+        offset = int(request.url.params["offset"])
+        limit = int(request.url.params["limit"])
+        # Slow enough that prefetched pages are in flight while earlier ones are written
+        await asyncio.sleep(0.01)
+        if request.headers["authorization"].split()[-1] in self.rejected and offset >= 500:
+            return httpx.Response(401, json={"error": "invalid_token"})
+        return httpx.Response(200, json={"count": len(self.receipts), "results": self.receipts[offset:offset + limit]})
+
+
+@pytest.fixture
+def etsy(monkeypatch):
+    """Stubbed Etsy, with a fresh token cache and an unconstrained rate limiter"""
+    monkeypatch.setattr(settings, "ETSY_RATE_LIMIT_PER_SECOND", 10000)
+    monkeypatch.setattr(settings, "ETSY_SHOP_RATE_LIMIT_PER_SECOND", 10000)
+    monkeypatch.setattr(etsy_service, "etsy_rate_limiter", EtsyRateLimiter())
+    monkeypatch.setattr(etsy_service, "oauth_token_cache", TokenCache())
+    return StubEtsy()
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "sync.db"
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    user = User(supertokens_user_id="st-user", email="user@example.com", name="User")
+    db.add(user)
+    db.commit()
+    db.add(OAuthToken(user_id=user.id, source="etsy", access_token="etsy-token", shop_id=str(SHOP_ID)))
+    sync_log = SyncLog(sync_type=SyncType.ORDER_IMPORT, source="etsy", user_id=user.id, status=SyncStatus.PENDING)
+    db.add(sync_log)
+    db.commit()
+    ids = (user.id, sync_log.id)
+    db.close()
+    try:
+        yield path, engine, ids
+    finally:
+        engine.dispose()
+
+
+def _token_queries(engine) -> list:
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _record(connection, cursor, statement, parameters, context, executemany):
+        if "oauth_tokens" in statement:
+            statements.append(statement)
+
+    return statements
+
+
+def _import(database, etsy: StubEtsy, use_async: bool) -> list:
+    """Run one import through SyncService and return the oauth_tokens queries it made"""
+    path, engine, (user_id, sync_log_id) = database
+
+    async def scenario():
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}") if use_async else None
+        token_queries = _token_queries(async_engine.sync_engine if use_async else engine)
+        if use_async:
+            db = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)()
+        else:
+            db = sessionmaker(bind=engine, autoflush=False)()
+        try:
+            async with httpx.AsyncClient(transport=httpx.MockTransport(etsy)) as client:
+                await SyncService(db, user_id, http_client=client).import_orders(sync_log_id, "etsy")
+        finally:
+            if use_async:
+                await db.close()
+                await async_engine.dispose()
+            else:
+                db.close()
+        return token_queries
+
+    return asyncio.run(scenario())
+
+
+def _assert_imported(engine, sync_log_id: int):
+    db = sessionmaker(bind=engine)()
+    try:
+        sync_log = db.get(SyncLog, sync_log_id)
+        assert (sync_log.status, sync_log.error_message) == (SyncStatus.SUCCESS, None)
+        assert sync_log.records_inserted == RECEIPTS
+        assert db.scalar(select(func.count(Order.id))) == RECEIPTS
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("use_async", [True, False], ids=["async_engine", "sync_engine"])
+def test_multi_page_import(database, etsy, use_async):
+    token_queries = _import(database, etsy, use_async)
+
+    _assert_imported(database[1], database[2][1])
+    assert len(etsy.requests) == RECEIPTS // settings.SYNC_BATCH_SIZE
+    # Token and shop are looked up once before the pages, not per request
+    assert len(token_queries) <= 3
+
+
+def test_token_replaced_mid_import_is_picked_up_after_a_401(database, etsy):
+    path, engine, (user_id, sync_log_id) = database
+
+    # This process still caches the old token when another one stores a new one
+    db = sessionmaker(bind=engine)()
+    assert asyncio.run(EtsyService(db=db, user_id=user_id).get_access_token()) == "etsy-token"
+    token = db.query(OAuthToken).one()
+    token.access_token = "new-token"
+    token.version = OAuthToken.version + 1
+    db.commit()
+    db.close()
+    etsy.rejected.add("etsy-token")
+
+    _import(database, etsy, use_async=True)
+
+    _assert_imported(engine, sync_log_id)
+    assert etsy.requests[-1].headers["authorization"] == "Bearer new-token"
+
+
+@pytest.mark.parametrize("status_changed", [False, True], ids=["same_receipt", "receipt_changed"])
+def test_receipt_inserted_by_a_concurrent_import_is_counted_once(db, user, status_changed):
+    receipt = _receipt(7)
+    service = SyncService(db, user.id)
+    read_existing = service._locked_existing_orders
+
+    def read_before_other_import_commits(session, external_ids):
+        existing = read_existing(session, external_ids)
+        if not getattr(read_before_other_import_commits, "raced", False):
+            read_before_other_import_commits.raced = True
+            # Another import of the same receipt commits between our read and our upsert
+            SyncService(db, user.id)._import_etsy_page(db, [{**receipt, "is_paid": False}] if status_changed else [receipt])
+            db.commit()
+        return existing
+
+    service._locked_existing_orders = read_before_other_import_commits
+    stats = service._import_etsy_page(db, [receipt])
+    db.commit()
+
+    assert (stats["records_inserted"], stats["records_updated"], stats["records_unchanged"]) == (
+        (0, 1, 0) if status_changed else (0, 0, 1)
+    )
+    counters = {(row.status.value, row.count) for row in db.query(OrderCounter) if row.count}
+    assert counters == {("processing", 1)}
+    assert [row.order_count for row in db.query(OrderMonthlyRollup)] == [1]
@@ -0,0 +1,17 @@
+from app.models.sync_log import SyncType
+from app.services.job_queue import claim_job, complete_job, enqueue_sync_job
+
+
+def test_second_job_for_a_user_and_source_waits_for_the_running_one(db, user):
+    first = enqueue_sync_job(db, user.id, SyncType.ORDER_IMPORT, "etsy")
+    second = enqueue_sync_job(db, user.id, SyncType.ORDER_IMPORT, "etsy")
+    other_source = enqueue_sync_job(db, user.id, SyncType.ORDER_IMPORT, "tiktok_shop")
+
+    job = claim_job(db, "worker-1")
+    assert job.sync_log_id == first.id
+    # The other source is free to run; the queued Etsy import is not
+    assert claim_job(db, "worker-2").sync_log_id == other_source.id
+    assert claim_job(db, "worker-2") is None
+
+    complete_job(db, job.id, "worker-1")
+    assert claim_job(db, "worker-2").sync_log_id == second.id
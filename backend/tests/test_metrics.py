@@ -0,0 +1,45 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.core import http
+from app.core.auth import get_session
+from app.core.config import settings
+from app.main import app
+
+METRICS_PATHS = ["/metrics/http", "/metrics/db", "/metrics/etsy-quota"]
+
+
+@pytest.fixture
+def client():
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize("path", METRICS_PATHS)
+def test_metrics_hidden_unless_enabled(client, path, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", False)
+    app.dependency_overrides[get_session] = lambda: object()
+    assert client.get(path).status_code == 404
+
+
+@pytest.mark.parametrize("path", METRICS_PATHS)
+def test_metrics_require_a_session(client, path, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_ENABLED", True)
+    assert client.get(path).status_code == 401
+
+    app.dependency_overrides[get_session] = lambda: object()
+    assert client.get(path).status_code == 200
+
+
+def test_http_pool_stats_survive_missing_httpx_internals(monkeypatch):
+    class Transport:
+        _pool = object()  # no .connections, as after an httpx upgrade
+
+    class Client:
+        _transport = Transport()
+
+    monkeypatch.setattr(http, "_client", Client())
+    stats = http.get_http_pool_stats()
+    assert stats["started"] is True
+    assert stats["connections"] == 0
@@ -0,0 +1,30 @@
+from app.models.order import Order
+from app.models.order_rollup import OrderMonthlyRollup
+from app.schemas.order import OrderCreate
+from app.services.order_stats import order_snapshot, rebuild_monthly_rollups, record_order_changes
+
+
+def _rollups(db, user):
+    return sorted(
+        (row.month, row.source, row.currency, row.order_count, row.revenue)
+        for row in db.query(OrderMonthlyRollup).filter(OrderMonthlyRollup.user_id == user.id)
+    )
+
+
+def test_incremental_rollups_match_a_rebuild_across_a_month_boundary(db, user):
+    # 01:00 on 1 March at UTC+2 is still February in UTC
+    for n, order_date in enumerate(["2026-03-01T01:00:00+02:00", "2026-03-01T03:00:00+02:00", "2026-02-28T23:30:00"]):
+        order_data = OrderCreate(
+            external_id=str(n), source="etsy", customer_name="Buyer",
+            total_amount=10 + n, order_date=order_date
+        ).dict()
+        order_data["user_id"] = user.id
+        db.add(Order(**order_data))
+        record_order_changes(db, user.id, added=[order_snapshot(order_data)])
+        db.commit()
+
+    incremental = _rollups(db, user)
+    assert [(month.month, count) for month, _, _, count, _ in incremental] == [(2, 2), (3, 1)]
+
+    rebuild_monthly_rollups(db, user.id)
+    assert _rollups(db, user) == incremental
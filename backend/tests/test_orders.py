@@ -0,0 +1,45 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.api.v1.endpoints import orders
+from app.core.auth import get_session
+from app.core.database import get_request_db
+from app.main import app
+from app.services.order_stats import count_orders
+
+ORDER = {
+    "external_id": "1001",
+    "source": "etsy",
+    "customer_name": "Buyer",
+    "total_amount": 12.5,
+    "order_date": "2026-03-01T10:00:00",
+}
+
+
+@pytest.fixture
+def client(db, user, monkeypatch):
+    async def request_db():
+        yield db
+
+    async def current_user_id(db, session):
+        return user.id
+
+    app.dependency_overrides[get_request_db] = request_db
+    app.dependency_overrides[get_session] = lambda: None
+    monkeypatch.setattr(orders, "get_current_user_id_async", current_user_id)
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_duplicate_order_is_a_conflict(client, db, user):
+    assert client.post("/api/v1/orders/", json=ORDER).status_code == 201
+
+    response = client.post("/api/v1/orders/", json={**ORDER, "customer_name": "Someone else"})
+    assert response.status_code == 409
+    assert response.json() == {"detail": "Order already exists"}
+
+    # The rejected insert leaves the counters alone and the session usable
+    assert count_orders(db, user.id) == 1
+    assert client.post("/api/v1/orders/", json={**ORDER, "external_id": "1002"}).status_code == 201
+    assert count_orders(db, user.id) == 2
@@ -0,0 +1,25 @@
+import asyncio
+import pytest
+from app.core.config import settings
+from app.services.integrations.rate_limiter import EtsyRateLimiter, RateLimitExceeded
+
+
+def test_each_process_keeps_to_its_share_of_the_key_quota(monkeypatch):
+    monkeypatch.setattr(settings, "ETSY_RATE_LIMIT_PER_SECOND", 10)
+    monkeypatch.setattr(settings, "ETSY_RATE_LIMIT_PER_DAY", 10000)
+    monkeypatch.setattr(settings, "ETSY_RATE_LIMIT_PROCESSES", 4)
+    monkeypatch.setattr(settings, "ETSY_MAX_QUOTA_WAIT", 0)
+    limiter = EtsyRateLimiter()
+
+    async def burst():
+        sent = 0
+        with pytest.raises(RateLimitExceeded):
+            while True:
+                await limiter.acquire("key")
+                sent += 1
+        return sent
+
+    # Four processes together send at most the key's 10 requests per second
+    assert asyncio.run(burst()) == 2
+    quota = limiter.quota("key")
+    assert (quota["processes"], quota["per_second_limit"], quota["per_day_limit"]) == (4, 2.5, 2500)
@@ -0,0 +1,67 @@
+from datetime import datetime
+from typing import List
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+from app.core.serialization import serialize_rows
+from app.models.order import Order, OrderSource, OrderStatus
+from app.models.product import Product, ProductStatus
+from app.schemas.order import Order as OrderSchema
+from app.schemas.product import Product as ProductSchema
+
+
+def _responses(rows, schema):
+    """Response bodies from the validated response_model path and from serialize_rows"""
+    api = FastAPI()
+
+    @api.get("/validated", response_model=List[schema])
+    def validated():
+        return rows
+
+    @api.get("/direct", response_model=List[schema])
+    def direct():
+        return ORJSONResponse(serialize_rows(rows, schema))
+
+    client = TestClient(api)
+    return client.get("/validated").content, client.get("/direct").content
+
+
+def test_orders_match_validated_response(db, user):
+    db.add_all([
+        Order(
+            user_id=user.id, external_id="1001", source=OrderSource.ETSY, status=OrderStatus.SHIPPED,
+            customer_name="Zoë Ünïcode", customer_email="John.Doe@Example.COM",
+            shipping_address={"city": "Köln", "lines": ["1 Main St", None]},
+            total_amount=19.99, currency="EUR", items=[{"title": "Mug", "quantity": 2, "price": 9.995}],
+            order_date=datetime(2026, 2, 11, 15, 0, 0, 123456),
+        ),
+        Order(
+            user_id=user.id, external_id="1002", source=OrderSource.TIKTOK_SHOP,
+            customer_name="No Email", customer_email=None, shipping_address=None,
+            total_amount=20, items=None, order_date=datetime(2026, 2, 12),
+        ),
+    ])
+    db.commit()
+    rows = db.query(Order).order_by(Order.id).all()
+
+    validated, direct = _responses(rows, OrderSchema)
+
+    assert direct == validated
+    assert b"John.Doe@example.com" in direct
+
+
+def test_products_match_validated_response(db, user):
+    db.add_all([
+        Product(
+            user_id=user.id, name="Mug", description="Ceramic ☕", sku="MUG-1", price=12.5,
+            quantity=3, images=["a.png"], tags=["kitchen"], variants={"colour": ["red", "blue"]},
+            status=ProductStatus.ACTIVE,
+        ),
+        Product(user_id=user.id, name="Plain", price=1),
+    ])
+    db.commit()
+    rows = db.query(Product).order_by(Product.id).all()
+
+    validated, direct = _responses(rows, ProductSchema)
+
+    assert direct == validated
@@ -0,0 +1,34 @@
+from sqlalchemy import create_engine, event
+from app.core.config import settings
+from app.core.sqlite import SqliteOptimizer, apply_sqlite_profile
+
+
+def test_profile_pragmas_are_set_on_connect(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'profile.db'}")
+    apply_sqlite_profile(engine)
+    with engine.connect() as connection:
+        pragma = lambda name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == settings.SQLITE_BUSY_TIMEOUT_MS
+        assert pragma("cache_size") == settings.SQLITE_CACHE_SIZE
+        assert pragma("temp_store") == 2  # MEMORY
+    engine.dispose()
+
+
+def test_optimizer_runs_once_per_interval(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'optimize.db'}")
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    monkeypatch.setattr(settings, "SQLITE_OPTIMIZE_INTERVAL", 60)
+    optimizer = SqliteOptimizer(engine)
+
+    optimizer.maybe_run()
+    assert statements == []
+
+    optimizer._last_run -= 61
+    assert optimizer.due()
+    optimizer.maybe_run()
+    assert statements == ["PRAGMA optimize"]
+    assert not optimizer.due()
+    engine.dispose()
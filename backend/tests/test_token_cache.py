@@ -0,0 +1,73 @@
+import asyncio
+import httpx
+from datetime import datetime, timedelta
+import pytest
+from app.core.config import settings
+from app.models.oauth_token import OAuthToken
+from app.services.integrations import etsy_service
+from app.services.integrations.etsy_service import EtsyService
+from app.services.integrations.token_cache import TokenCache
+
+
+@pytest.fixture
+def token_cache(monkeypatch):
+    cache = TokenCache()
+    monkeypatch.setattr(etsy_service, "oauth_token_cache", cache)
+    return cache
+
+
+def _access_token(db, user_id):
+    return asyncio.run(EtsyService(db=db, user_id=user_id).get_access_token())
+
+
+def test_reconnect_elsewhere_replaces_cached_token(db, user, token_cache, monkeypatch):
+    token = OAuthToken(user_id=user.id, source="etsy", access_token="old", expires_at=datetime.utcnow() + timedelta(hours=1))
+    db.add(token)
+    db.commit()
+    assert _access_token(db, user.id) == "old"
+
+    # Another process (the API's OAuth callback) stores new credentials; this process's cache is untouched
+    token.access_token = "new"
+    token.version = OAuthToken.version + 1
+    db.commit()
+
+    # Served from memory until the version is due for a re-check
+    assert _access_token(db, user.id) == "old"
+    monkeypatch.setattr(settings, "TOKEN_VERSION_CHECK_SECONDS", 0)
+    assert _access_token(db, user.id) == "new"
+
+
+def test_disconnect_elsewhere_drops_cached_token(db, user, token_cache, monkeypatch):
+    monkeypatch.setattr(settings, "TOKEN_VERSION_CHECK_SECONDS", 0)
+    token = OAuthToken(user_id=user.id, source="etsy", access_token="gone", expires_at=datetime.utcnow() + timedelta(hours=1))
+    db.add(token)
+    db.commit()
+    assert _access_token(db, user.id) == "gone"
+
+    db.delete(token)
+    db.commit()
+
+    assert _access_token(db, user.id) is None
+
+
+def test_rejected_token_is_rechecked_straight_away(db, user, token_cache):
+    token = OAuthToken(user_id=user.id, source="etsy", access_token="old", expires_at=datetime.utcnow() + timedelta(hours=1))
+    db.add(token)
+    db.commit()
+    assert _access_token(db, user.id) == "old"
+
+    token.access_token = "new"
+    token.version = OAuthToken.version + 1
+    db.commit()
+
+    async def rejected(request):
+        return httpx.Response(401, json={"error": "invalid_token"})
+
+    async def call():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(rejected)) as client:
+            service = EtsyService(db=db, user_id=user.id, http_client=client)
+            with pytest.raises(httpx.HTTPStatusError):
+                await service._make_request("GET", "/application/users/me")
+            return await service.get_access_token()
+
+    assert asyncio.run(call()) == "new"
@@ -0,0 +1,90 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import Request
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.auth import get_session
+from app.core.database import Base, get_request_db
+from app.core import user as user_module
+from app.main import app
+
+
+class _Session:
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+
+    def get_user_id(self) -> str:
+        return self.user_id
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """The app on a throwaway SQLite file, with sessions taken from an X-User header"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'api.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    async def request_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def session(request: Request):
+        return _Session(request.headers["x-user"])
+
+    app.dependency_overrides[get_request_db] = request_db
+    app.dependency_overrides[get_session] = session
+    monkeypatch.setattr(user_module, "user_id_cache", user_module.UserIdCache())
+    try:
+        yield app
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+
+def test_stalled_supertokens_lookup_does_not_block_other_requests(api, monkeypatch):
+    async def scenario():
+        release = asyncio.Event()
+        lookups = []
+
+        async def supertokens_core(request: httpx.Request) -> httpx.Response:
+            user_id = request.url.params["userId"]
+            lookups.append(user_id)
+            if user_id == "slow-user":
+                await release.wait()
+            return httpx.Response(200, json={"status": "OK", "user": {"emails": [f"{user_id}@example.com"]}})
+
+        supertokens_client = httpx.AsyncClient(transport=httpx.MockTransport(supertokens_core))
+        monkeypatch.setattr(user_module, "get_http_client", lambda: supertokens_client)
+
+        async with httpx.AsyncClient(app=api, base_url="http://test") as client:
+            slow = asyncio.ensure_future(
+                client.get("/api/v1/orders/count", headers={"x-user": "slow-user"})
+            )
+            for _ in range(500):
+                if "slow-user" in lookups or slow.done():
+                    break
+                await asyncio.sleep(0.01)
+            assert "slow-user" in lookups and not slow.done()
+
+            # New users (own SuperTokens lookup) and cached users are both served meanwhile
+            for n in range(10):
+                response = await asyncio.wait_for(
+                    client.get("/api/v1/orders/count", headers={"x-user": f"user-{n % 3}"}), timeout=5
+                )
+                assert response.status_code == 200
+                assert response.json() == {"count": 0}
+            assert not slow.done()
+
+            release.set()
+            response = await asyncio.wait_for(slow, timeout=5)
+            assert response.status_code == 200
+
+        await supertokens_client.aclose()
+        assert lookups.count("slow-user") == 1
+        assert sorted(set(lookups)) == ["slow-user", "user-0", "user-1", "user-2"]
+
+    asyncio.run(scenario())